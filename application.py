@@ -1,18 +1,107 @@
-from flask import Flask, render_template, request
-import urllib.parse, urllib.request, urllib.error, json, logging, base64
-import matplotlib.pyplot as plt
-import numpy as np
-from io import BytesIO
+from flask import Flask, render_template, stream_template, request, url_for, make_response, abort, g
+import urllib.parse, json, logging, os, sys, bisect, functools, threading, time
+from lazy_module import lazy_module
+#numpy is only imported once something actually needs it, so importing the app stays quick.
+np = lazy_module('numpy')
+from concurrent.futures import ThreadPoolExecutor
+from response_cache import response_cache
+from http_client import http_client, upstream_error, upstream_unavailable
+from fate_index import fate_index
+from fate_changes import fate_changes
+from deceased_index import deceased_index
+from league_store import league_store
+from fate_analysis import fate_stat_join
+from fate_tables import fate_tables
+from chart_cache import chart_cache
+from rendering import render_vibes_chart, render_fate_scatter, render_roster_vibes, render_fate_trend, FORMATS, warm_up as warm_up_charts
+from team_directory import team_directory
+from single_flight import single_flight
+import json_codec, metrics
+from vibes import roster_vibes, day_extremes, group_extremes, DAYS
 
 app = Flask(__name__)
 
+INDEX_PATH = os.environ.get('BLASEBALL_INDEX_PATH', 'blaseball_index.sqlite3')
+
+#Compacted Fate-change timelines for every player that's been looked up, so repeat views only fetch new updates.
+fate_store = fate_index(INDEX_PATH)
+
+#Every Fate change in the league, found by fate_scan.py, so they can be listed by cause without going through each player's history.
+league_fate_changes = fate_changes(INDEX_PATH)
+
+#The deceased player pool, split up by team so the Hall of Flame roster can be read without downloading the whole pool.
+#It's brought up to date in the background once it's older than HALL_OF_FLAME_REFRESH seconds.
+hall_of_flame = deceased_index(INDEX_PATH)
+HALL_OF_FLAME_REFRESH = float(os.environ.get('HALL_OF_FLAME_REFRESH', 3600))
+hall_of_flame_refreshing = threading.Lock()
+
+#Snapshot of every season's players, teams and stats written by ingest.py. Routes fall back to the live APIs for seasons it doesn't have.
+LEAGUE_DATA_PATH = os.environ.get('LEAGUE_DATA_PATH', 'league_data')
+league_data = league_store(LEAGUE_DATA_PATH)
+
+#Fate-vs-stat correlations, fits and joined points for every season and stat in the snapshot, precomputed by ingest.py.
+fate_stats = fate_tables(LEAGUE_DATA_PATH)
+
+#playerStats takes the ids in the query string, so big lists of players are sent in batches to keep the URL a sane length.
+STATS_BATCH = 200
+
+#Rendered charts, keyed by what they're drawn from. They're served from their own URLs so browsers can cache them too.
+charts = chart_cache(int(os.environ.get('CHART_CACHE_MAX_BYTES', 64 * 1024 * 1024)))
+CHART_MAX_AGE = int(os.environ.get('CHART_MAX_AGE', 86400))
+
+#Base URLs for the two upstream APIs. These can be pointed at a local stub for benchmarking.
+CHRONICLER_URL = os.environ.get('CHRONICLER_URL', 'https://api.sibr.dev/chronicler/v1')
+REFERENCE_URL = os.environ.get('REFERENCE_URL', 'https://api.blaseball-reference.com')
+
+#One pooled keep-alive client is shared by every fetcher, so repeat calls to the same host reuse their connections.
+client = http_client(connect_timeout = float(os.environ.get('UPSTREAM_CONNECT_TIMEOUT', 5)),
+    read_timeout = float(os.environ.get('UPSTREAM_READ_TIMEOUT', 30)),
+    retries = int(os.environ.get('UPSTREAM_RETRIES', 3)),
+    per_host_limit = int(os.environ.get('UPSTREAM_PER_HOST_LIMIT', 8)))
+
+#Background threads used to fetch the next page of a paged upstream response while the current one is processed,
+#and a season's playerStats batches all at once.
+prefetcher = ThreadPoolExecutor(max_workers = int(os.environ.get('PREFETCH_THREADS', 8)), thread_name_prefix = 'prefetch')
+
+#Concurrent requests for the same upstream URL (or the same bigger job, like a player's Fate history) share a single fetch,
+#so a burst of traffic for one popular page only goes upstream once.
+flights = single_flight()
+
+#Everything the app pulls from Blaseball Reference and Chronicler is historical, so it's cached on disk and shared between workers.
+#TTL and size can be tuned through the environment.
+cache = response_cache(os.environ.get('BLASEBALL_CACHE_PATH', 'blaseball_cache.sqlite3'),
+    ttl = float(os.environ.get('BLASEBALL_CACHE_TTL', 86400)),
+    max_bytes = int(os.environ.get('BLASEBALL_CACHE_MAX_BYTES', 256 * 1024 * 1024)))
+
 def pretty(obj):
     #I stole this! (Thank you for making this it is very useful)
     return json.dumps(obj, sort_keys=True, indent=2)
 
+def fetch_json(request, fresh = False):
+    #Gets the JSON at the given URL, checking the response cache before going upstream.
+    #Raises upstream_error if the request fails. Only successful responses are cached, since the client raises on anything else.
+    #If the same URL is already being fetched, this waits for that fetch and returns its parsed result, which mustn't be modified.
+    #fresh skips the cache check (the new response still replaces the cached one), for background refreshes that have to see upstream changes.
+    if not fresh:
+        with metrics.span('cache'):
+            requeststr = cache.get(request)
+        if requeststr is not None:
+            with metrics.span('json_decode'):
+                return json_codec.loads(requeststr)
+    return flights.do(request, lambda: download_json(request))
+
+def download_json(request):
+    with metrics.upstream(request):
+        requeststr = client.get(request)
+    with metrics.span('cache'):
+        cache.set(request, requeststr)
+    with metrics.span('json_decode'):
+        return json_codec.loads(requeststr)
+
 class player_record():
     #A Blaseball player, and all the relevant stats except vibes (since those change too frequently to be encapsulated by a static value)
     #Created using dicts returned by Blaseball Reference.
+    __slots__ = ('name', 'team', 'ritual', 'id', 'cinnamon', 'buoyancy', 'pressurization', 'fate')
     def __init__(self, dict):
         self.name = dict["player_name"]
         self.team = dict["team"]
@@ -23,48 +112,92 @@ class player_record():
         self.pressurization = float(dict["pressurization"])
         self.fate = int(dict["fate"])
 
+class fate_sentinel():
+    #Stands in for a Fate value Chronicler didn't give us. There's one of each kind, so they're compared with 'is'.
+    #name is what gets stored in the fate index; text is the wordy version shown on the page, written so it can be read straight into a sentence.
+    __slots__ = ('name', 'text')
+    def __init__(self, name, text):
+        self.name = name
+        self.text = text
+    def __str__(self):
+        return self.text
+    def __repr__(self):
+        return self.name
+
+FATE_UNTRACKED = fate_sentinel('untracked', "not yet tracked by Chronicler")
+FATE_NONE = fate_sentinel('none', "none, according to the API. In reality, they likely had one that just wasn't tracked. Chronicler is inconsistent at times")
+#Looks a sentinel up by its stored name. Older fate index rows stored the display text instead, so that works too.
+FATE_SENTINELS = {key: sentinel for sentinel in [FATE_UNTRACKED, FATE_NONE] for key in [sentinel.name, sentinel.text]}
+
+NOT_TRACKED = "NOT YET TRACKED"
+
+#A player usually has the same handful of modification sets across thousands of updates, so each distinct set is only stored once.
+modification_sets = {}
+
+def intern_modifications(mods):
+    mods = tuple(sys.intern(mod) for mod in mods)
+    return modification_sets.setdefault(mods, mods)
+
 class player_chronicle():
     #A Blaseball player, and all the relevant stats except vibes (since those change too frequently to be encapsulated by a static value) at a given time period.
     #Created using dicts returned by Chronicler.
-    #placeholder fate values are wordy so that they can be directly read in the HTML and still flow well.
+    #Players can have thousands of these, so they use __slots__ and share their strings:
+    #team IDs, rituals and modification sets are interned, and a missing Fate is one of the fate_sentinels rather than a string of its own.
+    __slots__ = ('name', 'timestamp', 'teamID', 'ritual', 'id', 'fate', 'modifications', 'fateChange')
     def __init__(self, dict):
+        data = dict["data"]
         self.fateChange = None
-        self.name = dict["data"]["name"]
+        self.name = sys.intern(data["name"])
         self.timestamp = dict["lastSeen"]
-        self.date = self.timestamp[0:10]
-        self.time = self.timestamp[11:19]
-        if "leagueTeamId" in dict["data"]:
-            self.teamID = dict["data"]["leagueTeamId"]
-        else:
-            self.teamID = "NOT YET TRACKED"
-        if "ritual" in dict["data"]:
-            self.ritual = dict["data"]["ritual"]
-        else:
-            self.ritual = "NOT YET TRACKED"
-        self.id = dict["playerId"]
-        if "fate" in dict["data"]:
-            if dict["data"]["fate"]:
-                self.fate = int(dict["data"]["fate"])
+        self.teamID = sys.intern(data["leagueTeamId"]) if "leagueTeamId" in data else NOT_TRACKED
+        self.ritual = sys.intern(data["ritual"]) if "ritual" in data else NOT_TRACKED
+        self.id = sys.intern(dict["playerId"])
+        if "fate" in data:
+            if data["fate"]:
+                self.fate = int(data["fate"])
             else:
-                self.fate = "none, according to the API. In reality, they likely had one that just wasn't tracked. Chronicler is inconsistent at times"
+                self.fate = FATE_NONE
         else:
-            self.fate = "not yet tracked by Chronicler"
-        self.modifications = []
-        for key in ["gameAttr","permAttr","seasAttr","weekAttr"]:
-            if key in dict["data"]:
-                for mod in dict["data"][key]:
-                    self.modifications.append(mod)
+            self.fate = FATE_UNTRACKED
+        self.modifications = intern_modifications(mod for key in ["gameAttr","permAttr","seasAttr","weekAttr"] for mod in data.get(key, ()))
+    @property
+    def date(self):
+        return self.timestamp[0:10]
+    @property
+    def time(self):
+        return self.timestamp[11:19]
+    def has_fate(self):
+        #Whether this update actually says what the player's Fate was.
+        return not isinstance(self.fate, fate_sentinel)
+    def compact(self):
+        #The fields needed to rebuild this record later, as a plain dict that can be stored in the fate index.
+        compact = {key: getattr(self, key) for key in self.__slots__}
+        if not self.has_fate():
+            compact["fate"] = self.fate.name
+        compact["modifications"] = list(self.modifications)
+        return compact
+    @classmethod
+    def from_compact(cls, compact):
+        #Rebuilds a record saved with compact().
+        record = cls.__new__(cls)
+        for key, value in compact.items():
+            setattr(record, key, value)
+        if isinstance(record.fate, str):
+            record.fate = FATE_SENTINELS[record.fate]
+        record.modifications = intern_modifications(record.modifications)
+        return record
     def __str__(self):
         return f"""{self.name}   ({self.date} at {self.time})
         ID: {self.id}
         Team ID: {self.teamID}
         Pregame ritual: {self.ritual}
-        Modifications: {self.modifications}
+        Modifications: {list(self.modifications)}
         Fate: {self.fate}
         Reason for change to Fate: {self.fateChange}\n"""
 
 class team_record():
     #Stores name and ID for a blaseball team or location, as well as if it's a team or location.
+    __slots__ = ('name', 'id', 'status', 'emoji', 'type')
     def __init__(self, dict, type = 'team'):
         self.name = dict["full_name"]
         self.id = dict["team_id"]
@@ -82,216 +215,340 @@ def area_record(name, emoji, id):
     area = {"full_name": name, "team_id": id, "team_current_status": None, "team_emoji": emoji}
     return team_record(area, type='area')
 
-def get_player_history(id, page = None):
+def chronicler_request(endpoint, id, page = None, after = None):
+    #The URL for a page of one of Chronicler's per-player update endpoints ('/players/updates' or '/roster/updates').
+    params = {'player': id, 'count': 1000}
+    if page:
+        params['page'] = page
+    if after:
+        params['after'] = after
+    paramstr = urllib.parse.urlencode(params)
+    return CHRONICLER_URL+endpoint+'?'+paramstr
+
+def get_player_history(id, page = None, after = None):
     #Get a page of player history updates from Chronicler.
     #Returns the pagination token for the next page alongside the data,
     #which can be fed back to the function as page to get the next page of updates.
-    try:
-        if page:
-            paramstr = urllib.parse.urlencode({'player': id, 'count': 1000, 'page': page})
-        else: 
-            paramstr = urllib.parse.urlencode({'player': id, 'count': 1000})
-        baseurl = 'https://api.sibr.dev/chronicler/v1/players/updates'
-        request = baseurl+'?'+paramstr
-        requeststr = urllib.request.urlopen(request).read()
-        data = json.loads(requeststr)
-    except urllib.error.URLError as e:
-        if hasattr(e,"code"):
-            print("The server couldn't fulfill the request.")
-            print("Error code: ", e.code)
-        elif hasattr(e,'reason'):
-            print("We failed to reach a server")
-            print("Reason: ", e.reason)
-    else:
-        return data
+    #If after is given, only updates after that timestamp are returned.
+    data = fetch_json(chronicler_request('/players/updates', id, page, after))
+    return data
+
+def get_latest_update(id):
+    #Get the player's most recent stat update from Chronicler, or None if it doesn't have any.
+    paramstr = urllib.parse.urlencode({'player': id, 'count': 1, 'order': 'desc'})
+    data = fetch_json(CHRONICLER_URL+'/players/updates?'+paramstr)
+    return data["data"][0] if data["data"] else None
+
+def get_roster_history(id, page = None):
+    #Get a page of roster updates for a player from Chronicler. Paged the same way as get_player_history.
+    data = fetch_json(chronicler_request('/roster/updates', id, page))
+    return data
 
-def roster_swap_doublecheck(player):
-    #Call chronicler records for before and after the Fate change and checks if there was a team change.
+def iter_pages(get_page, id, **params):
+    #Yields the data from every page of a paged Chronicler endpoint, given the function that gets a single page.
+    #Any extra keyword arguments are passed along to every call of it.
+    #The next page is requested in the background as soon as the current page's token is known,
+    #so the round trip for it overlaps with whatever the caller does with the current page.
+    #Only the page being processed and the one being fetched are held in memory at once.
+    page = None
+    pending = prefetcher.submit(get_page, id, page, **params)
+    while True:
+        data = pending.result()
+        if page == data["nextPage"] or data["nextPage"] == None:
+            app.logger.debug(f"Got the last page of {id}.")
+            return
+        page = data["nextPage"]
+        pending = prefetcher.submit(get_page, id, page, **params)
+        app.logger.debug(f"Got a page of {id}. Calling {page} next.")
+        entries = data["data"]
+        del data
+        yield entries
+
+class roster_timeline():
+    #Every roster update Chronicler has for one player, sorted by when it was first seen,
+    #so the team they were on just before or just after any moment can be found with a bisect instead of another request.
+    def __init__(self, updates):
+        updates = sorted(updates, key = lambda i: i.get("firstSeen") or i.get("timestamp") or '')
+        self.times = [update.get("firstSeen") or update.get("timestamp") or '' for update in updates]
+        self.teams = [update["teamId"] for update in updates]
+    def team_before(self, timestamp):
+        #The team from the last roster update strictly before the timestamp, or None if there isn't one.
+        i = bisect.bisect_left(self.times, timestamp)
+        return self.teams[i-1] if i > 0 else None
+    def team_after(self, timestamp):
+        #The team from the first roster update strictly after the timestamp, or None if there isn't one.
+        i = bisect.bisect_right(self.times, timestamp)
+        return self.teams[i] if i < len(self.teams) else None
+
+def get_roster_timeline(id):
+    #Gets every page of roster updates for the player of the given ID, indexed as a roster_timeline.
+    updates = []
+    for entries in iter_pages(get_roster_history, id):
+        updates.extend(entries)
+    return roster_timeline(updates)
+
+def roster_swap_doublecheck(player, timeline):
+    #Checks the player's roster timeline on either side of the Fate change to see if there was a team change.
     #Chronicler doesn't track team as part of player records for earlier seasons,
     #But it DOES still have roster updates for those seasons.
     #So, cross-reference the roster-updates.
-    try:
-        paramstr1 = urllib.parse.urlencode({'player': player.id, 'count': 1, 'before': player.timestamp})
-        paramstr2 = urllib.parse.urlencode({'player': player.id, 'count': 1, 'after': player.timestamp})
-        baseurl = 'https://api.sibr.dev/chronicler/v1/roster/updates'
-        request1 = baseurl+'?'+paramstr1
-        requeststr1 = urllib.request.urlopen(request1).read()
-        data1 = json.loads(requeststr1)
-        request2 = baseurl+'?'+paramstr2
-        requeststr2 = urllib.request.urlopen(request2).read()
-        data2 = json.loads(requeststr2)
-    except urllib.error.URLError as e:
-        if hasattr(e,"code"):
-            print("The server couldn't fulfill the request.")
-            print("Error code: ", e.code)
-        elif hasattr(e,'reason'):
-            print("We failed to reach a server")
-            print("Reason: ", e.reason)
-    else:
-        if data1['data'] and data2['data']:
-            if data1['data'][0]['teamId'] != data2['data'][0]['teamId']:
-                return True
-            else:
-                return False
+    before = timeline.team_before(player.timestamp)
+    after = timeline.team_after(player.timestamp)
+    if before and after:
+        if before != after:
+            return True
+        else:
+            return False
+
+def iter_player_history(id, after = None):
+    #Streams every stat update for the player of the given ID as player_chronicle objects, one page at a time.
+    #If after is given, only the updates after that timestamp are streamed.
+    for entries in iter_pages(get_player_history, id, after = after):
+        with metrics.span('records'):
+            records = [player_chronicle(entry) for entry in entries]
+        yield from records
 
 def get_full_player_history(id):
     #gets every page of stat updates for the player of the given ID.
-    #Returns a flat list of dictionaries, as opposed to the nested mess directly returned by get_player_history.
-    output = []
-    loop = True
-    page = None
-    while loop:
-        data = get_player_history(id, page)
-        if page == data["nextPage"] or data["nextPage"] == None:
-            loop = False
-            print("Looping done!")
-        else:
-            page = data["nextPage"]
-            output.append(data["data"])
-            print(f"Appended page. Calling {page} next.")
-    flatput = []
-    for lst in output:
-        for dic in lst:
-            #print(pretty(dic))
-            flatput.append(dic)
-    cleanput = [player_chronicle(entry) for entry in flatput]
-    return cleanput
+    #Returns a flat list of player_chronicle objects, as opposed to the nested mess directly returned by get_player_history.
+    return list(iter_player_history(id))
 
-def fate_filtered_history(input):
-    #Takes a player's stat updates as a list of dictionaries (as returned by get_full_player_history())
-    #Returns a list with only the updates where Fate changed, as well as why said changes occured.
-    output = []
-    last_entry = None
-    for entry in input:
-        if entry.fate not in ['not yet tracked by Chronicler','none, according to the API. In reality, they likely had one that just wasn\'t tracked. Chronicler is inconsistent at times']:
-            if last_entry != None:
-                if last_entry.fate != entry.fate and last_entry.fate != "NONE":
-                    if output[-1].timestamp != last_entry.timestamp:
-                        output.append(last_entry)
-                    if 'ALTERNATE' in entry.modifications and 'ALTERNATE' not in last_entry.modifications:
-                        entry.fateChange = "due to becoming an Alternate."
-                    elif entry.teamID != last_entry.teamID:
-                        entry.fateChange = "due to a Feedback swap."
-                    else:
-                        feedback_doublecheck = roster_swap_doublecheck(entry)
-                        if feedback_doublecheck:
-                            entry.fateChange = "due to a Feedback swap."
+#The reasons fate_tracker gives for a Fate change, and the short names the league-wide Fate-change table files them under.
+ALTERNATE_CHANGE = "due to becoming an Alternate."
+FEEDBACK_CHANGE = "due to a Feedback swap."
+UNKNOWN_CHANGE = "due to... some other cause. (If you're seeing this, odds are that there's been an error.)"
+CHANGE_CAUSES = {FEEDBACK_CHANGE: 'feedback', ALTERNATE_CHANGE: 'alternate', UNKNOWN_CHANGE: 'unknown'}
+
+class fate_tracker():
+    #Runs the Fate-change detection over a player's stat updates as they come in.
+    #Everything it needs to carry on is kept on the object, so a tracker saved to the fate index
+    #can be resumed later and fed only the updates that came after it.
+    def __init__(self, output = None, last_entry = None):
+        self.output = output or []
+        self.last_entry = last_entry
+        self.newest = last_entry
+        #Only fetched the first time a change can't be explained from the player records alone.
+        self.timeline = None
+
+    @classmethod
+    def resume(cls, saved):
+        #Rebuilds a tracker from what fate_index.load() returned.
+        last_seen, last_entry, changes = saved
+        return cls([player_chronicle.from_compact(entry) for entry in changes], player_chronicle.from_compact(last_entry) if last_entry else None)
+
+    @staticmethod
+    def saved_state(index, id):
+        #What the fate index has for the player, or None if there's nothing to resume from.
+        #Rows saved back when last_entry was the last update of any kind, rather than the last one with a Fate, can't be resumed exactly,
+        #so they count as missing and the player is rebuilt from their full history.
+        saved = index.load(id)
+        if saved and saved[1] and isinstance(saved[1]["fate"], str):
+            return None
+        return saved
+
+    def feed(self, input):
+        #Takes a player's stat updates as player_chronicle objects, either as a list (as returned by get_full_player_history())
+        #or streamed straight from iter_player_history(), in which case processing starts before the last page arrives.
+        #Returns how many updates were fed in.
+        output = self.output
+        last_entry = self.last_entry
+        count = 0
+        for entry in input:
+            count += 1
+            self.newest = entry
+            if entry.has_fate():
+                if last_entry != None:
+                    if last_entry.fate != entry.fate and last_entry.fate != "NONE":
+                        if output[-1].timestamp != last_entry.timestamp:
+                            output.append(last_entry)
+                        if 'ALTERNATE' in entry.modifications and 'ALTERNATE' not in last_entry.modifications:
+                            entry.fateChange = ALTERNATE_CHANGE
+                        elif entry.teamID != last_entry.teamID:
+                            entry.fateChange = FEEDBACK_CHANGE
                         else:
-                            if entry.name in ['Axel Trololol','Lachlan Shelton','Antonio Wallace','Hobbs Cain']:
-                                #Chronicler doesn't have proper records for feedback swaps involving these players.
-                                #I have manually verified that all of their Fate changes coincide with a feedback swap.
-                                entry.fateChange = "due to a Feedback swap."
+                            if self.timeline == None:
+                                self.timeline = get_roster_timeline(entry.id)
+                            with metrics.span('roster_swap_doublecheck'):
+                                feedback_doublecheck = roster_swap_doublecheck(entry, self.timeline)
+                            if feedback_doublecheck:
+                                entry.fateChange = FEEDBACK_CHANGE
                             else:
-                                entry.fateChange = "due to... some other cause. (If you're seeing this, odds are that there's been an error.)"
+                                if entry.name in ['Axel Trololol','Lachlan Shelton','Antonio Wallace','Hobbs Cain']:
+                                    #Chronicler doesn't have proper records for feedback swaps involving these players.
+                                    #I have manually verified that all of their Fate changes coincide with a feedback swap.
+                                    entry.fateChange = FEEDBACK_CHANGE
+                                else:
+                                    entry.fateChange = UNKNOWN_CHANGE
+                        output.append(entry)
+                else:
+                    #Always append the first entry, to represent debut state
                     output.append(entry)
-            else:
-                #Always append the first entry, to represent debut state
-                output.append(entry)
-            last_entry = entry
-    #people's names change and I'd like to make sure I use the most recent name.
-    output[0].name = input[-1].name
-    return output
+                last_entry = entry
+        self.last_entry = last_entry
+        #people's names change and I'd like to make sure I use the most recent name.
+        if output:
+            output[0].name = self.newest.name
+        return count
+
+    def save(self, index):
+        #Stores the tracker in the fate index under the player's ID. The last update with a Fate is what the next update gets compared against,
+        #while the timestamp is that of the newest update fed in, so resuming doesn't fetch the updates after it again.
+        last_entry = self.last_entry.compact() if self.last_entry else None
+        index.save(self.newest.id, self.newest.timestamp, last_entry, [entry.compact() for entry in self.output])
+
+def fate_filtered_history(input):
+    #Takes a player's stat updates as player_chronicle objects, as a list or streamed from iter_player_history().
+    #Returns a list with only the updates where Fate changed, as well as why said changes occured.
+    tracker = fate_tracker()
+    tracker.feed(input)
+    return tracker.output
+
+def build_and_feed(tracker, entries):
+    #Turns a decoded page of stat updates into player_chronicles and runs them through the tracker, timing each step separately.
+    with metrics.span('records'):
+        records = [player_chronicle(entry) for entry in entries]
+    with metrics.span('fate_filter'):
+        return tracker.feed(records)
+
+def latest_player_name(id):
+    #The player's current name, or None if Chronicler doesn't know them. An indexed player's saved timeline already starts with it;
+    #anyone else takes it from their newest update, so a streamed page can show it before their history has been worked out.
+    saved = fate_store.load(id)
+    if saved and saved[2]:
+        return saved[2][0]["name"]
+    latest = get_latest_update(id)
+    return latest["data"]["name"] if latest else None
+
+def fate_history_updates(id):
+    #Yields the entries of the player's Fate-change history, using the fate index so only updates since the last request need to be fetched.
+    #Each entry comes out as soon as the page of stat updates it's on has been processed. Whatever the fate index already has comes first, straight away.
+    #Only the changes, the page being processed and the one being fetched are held in memory at once.
+    saved = fate_tracker.saved_state(fate_store, id)
+    if saved:
+        tracker = fate_tracker.resume(saved)
+        after = saved[0]
+    else:
+        tracker = fate_tracker()
+        after = None
+    yield from tracker.output
+    sent = len(tracker.output)
+    count = 0
+    for entries in iter_pages(get_player_history, id, after = after):
+        count += build_and_feed(tracker, entries)
+        yield from tracker.output[sent:]
+        sent = len(tracker.output)
+    if count:
+        tracker.save(fate_store)
+
+def streamed_fate_history(id):
+    #Yields the player's Fate-change history for a streamed /fhist, an entry at a time as it's worked out.
+    #If another request is already working out the same player's history, this waits for it and yields its result,
+    #and if this one gets there first, the others wait for it the same way.
+    key = ('fate_history', id)
+    found, leader = flights.join(key)
+    if not leader:
+        found.done.wait()
+        yield from found.outcome()
+        return
+    output = []
+    updates = fate_history_updates(id)
+    try:
+        for entry in updates:
+            output.append(entry)
+            yield entry
+    except GeneratorExit:
+        #The client went away partway through. The rest is still worked out, for anyone waiting on the same player and for the index.
+        try:
+            output.extend(updates)
+        except Exception as e:
+            flights.land(key, found, error = e)
+            return
+    except BaseException as e:
+        flights.land(key, found, error = e)
+        raise
+    flights.land(key, found, output)
 
 def get_players_seasonal(season = 23):
     #Gets the Blaseball Reference records for all players in a given season.
-    try:
-        paramstr = paramstr = urllib.parse.urlencode({'season': season})
-        baseurl = 'https://api.blaseball-reference.com/v2/players'
-        request = baseurl+'?'+paramstr
-        requeststr = urllib.request.urlopen(request).read()
-        data = json.loads(requeststr)
-    except urllib.error.URLError as e:
-        if hasattr(e,"code"):
-            print("The server couldn't fulfill the request.")
-            print("Error code: ", e.code)
-        elif hasattr(e,'reason'):
-            print("We failed to reach a server")
-            print("Reason: ", e.reason)
-    else:
-        return data
+    paramstr = urllib.parse.urlencode({'season': season})
+    baseurl = REFERENCE_URL+'/v2/players'
+    request = baseurl+'?'+paramstr
+    data = fetch_json(request)
+    return data
 
-def get_pooled_players(pool = 'deceased'):
+def get_pooled_players(pool = 'deceased', fresh = False):
     #Gets the Blaseball Reference records for all players in a specific 'playerPool' category.
     #This defaults to getting all dead players, and that's all I use it for.
-    try:
-        paramstr = paramstr = urllib.parse.urlencode({'playerPool': pool})
-        baseurl = 'https://api.blaseball-reference.com/v2/players'
-        request = baseurl+'?'+paramstr
-        requeststr = urllib.request.urlopen(request).read()
-        data = json.loads(requeststr)
-    except urllib.error.URLError as e:
-        if hasattr(e,"code"):
-            print("The server couldn't fulfill the request.")
-            print("Error code: ", e.code)
-        elif hasattr(e,'reason'):
-            print("We failed to reach a server")
-            print("Reason: ", e.reason)
-    else:
-        return data
+    #fresh goes upstream even if the response is cached.
+    paramstr = urllib.parse.urlencode({'playerPool': pool})
+    baseurl = REFERENCE_URL+'/v2/players'
+    request = baseurl+'?'+paramstr
+    data = fetch_json(request, fresh)
+    return data
 
 def get_player(id = None):
     #Gets the Blaseball Reference records for a given player.
     #This gets EVERY player if it doesn't get an ID. I don't use this in the final program, but it was helpful for testing.
-    try:
-        paramstr = id
-        baseurl = 'https://api.blaseball-reference.com/v2/players/'
-        request = baseurl+str(paramstr or '')
-        requeststr = urllib.request.urlopen(request).read()
-        data = json.loads(requeststr)
-    except urllib.error.URLError as e:
-        if hasattr(e,"code"):
-            print("The server couldn't fulfill the request.")
-            print("Error code: ", e.code)
-        elif hasattr(e,'reason'):
-            print("We failed to reach a server")
-            print("Reason: ", e.reason)
-    else:
-        return data
+    paramstr = id
+    baseurl = REFERENCE_URL+'/v2/players/'
+    request = baseurl+str(paramstr or '')
+    data = fetch_json(request)
+    return data
 
 def get_team_roster(id, includeShadows = True):
     #Get the Blaseball Reference records for all the players on a specific team.
     #includeShadows sets whether or not to return reserve ("shadowed") players.
-    try:
-        paramstr = urllib.parse.urlencode({'teamId': id, 'includeShadows': includeShadows})
-        baseurl = 'https://api.blaseball-reference.com/v1/currentRoster'
-        request = baseurl+'?'+paramstr
-        requeststr = urllib.request.urlopen(request).read()
-        data = json.loads(requeststr)
-    except urllib.error.URLError as e:
-        if hasattr(e,"code"):
-            print("The server couldn't fulfill the request.")
-            print("Error code: ", e.code)
-        elif hasattr(e,'reason'):
-            print("We failed to reach a server")
-            print("Reason: ", e.reason)
-    else:
-        return data
+    paramstr = urllib.parse.urlencode({'teamId': id, 'includeShadows': includeShadows})
+    baseurl = REFERENCE_URL+'/v1/currentRoster'
+    request = baseurl+'?'+paramstr
+    data = fetch_json(request)
+    return data
 
-def get_teams(season = 23):
+def get_teams(season = 23, fresh = False):
     #Returns the Blaseball Reference records for all the teams as of a specific season.
-    try:
-        paramstr = urllib.parse.urlencode({'season': season})
-        baseurl = 'https://api.blaseball-reference.com/v2/teams'
-        request = baseurl+'?'+paramstr
-        requeststr = urllib.request.urlopen(request).read()
-        data = json.loads(requeststr)
-    except urllib.error.URLError as e:
-        if hasattr(e,"code"):
-            print("The server couldn't fulfill the request.")
-            print("Error code: ", e.code)
-        elif hasattr(e,'reason'):
-            print("We failed to reach a server")
-            print("Reason: ", e.reason)
-    else:
-        return data
+    #fresh goes upstream even if the response is cached.
+    paramstr = urllib.parse.urlencode({'season': season})
+    baseurl = REFERENCE_URL+'/v2/teams'
+    request = baseurl+'?'+paramstr
+    data = fetch_json(request, fresh)
+    return data
 
-def clean_team_list(season = 23):
+def clean_team_list(season = 23, fresh = False):
     #Returns the Blaseball Reference records for all the teams as of a specific season,
-    #formatted as team_record objects.
-    team_list = get_teams(season)
+    #formatted as team_record objects. Uses the local snapshot if the season's been ingested.
+    #fresh skips the response cache when the list has to come from upstream.
+    if league_data.has_season(season):
+        team_list = league_data.teams(season)
+    else:
+        team_list = get_teams(season, fresh)
     clean_list = [team_record(team) for team in team_list]
     return clean_list
 
+def build_team_directory(season, fresh = False):
+    #Builds the team lists the team directory keeps for a season: every team, and the filtered list for the team selection pages.
+    data = clean_team_list(season, fresh)
+    outdata = []
+    for team in data:
+        if team.name == "The Hall Stars":
+            #The Hall Stars name has 'The' in it, unlike every other team. This fixes that so it fits into the templates right.
+            team.name = "Hall Stars"
+            app.logger.info(f"***Editing the Hall Stars!")
+        if team.name != "Hall Stars" and team.status != 'active':
+            #Only active teams from the list are displayed.
+            #The Hall Stars are an exception to this, as their roster has seen actual play, unlike other inactive teams.
+            app.logger.info(f"***Removing {team} from roster")
+        else:
+            app.logger.info(f"***{team} remains. They are {team.status}")
+            outdata.append(team)
+    #The Vault and the Hall of Flame are not proper teams, but I'd like the option to analyze players from them.
+    #As such, area-type records for both are generated and added.
+    outdata.append(area_record("Vault", "0x1F947", '698cfc6d-e95e-4391-b754-b87337e4d2a9'))
+    outdata.append(area_record("Hall of Flame", "0x1f480", 'Underworld'))
+    return data, outdata
+
+#Team lists are built once per season and shared by /vteam, /fteam and anything that needs to turn a team ID into a name.
+directory = team_directory(build_team_directory, refresh_interval = float(os.environ.get('TEAM_REFRESH_INTERVAL', 3600)))
+
 def get_player_stats(category, season, players):
     #Takes a type of stat (pitching or batting), a season, and a list of dictionaries of player stats as returned by Blaseball Reference.
     #Returns the corresponding performance stats for that season for all players inputted as a list of dictionaries.
@@ -300,22 +557,227 @@ def get_player_stats(category, season, players):
     for player in players:
         i+=1
         playerIds = playerIds+str(player['player_id'])+','
+    app.logger.info(i)
+    paramstr = urllib.parse.urlencode({'category':category, 'season':season, 'playerIds':playerIds})
+    baseurl = REFERENCE_URL+'/v1/playerStats'
+    request = baseurl+'?'+paramstr
+    data = fetch_json(request)
+    return data
+
+#The performance stats that can be compared against Fate, as (name in the API, name to display).
+batter_stats = [('doubles', 'Doubles'),
+    ('triples','Triples'),
+    ('home_runs','Home Runs (HR)'),
+    ('runs_batted_in','Runs batted in (RBI)'),
+    ('walks','Walks (Bases on Balls)'),
+    ('strikeouts','Strikeouts'),
+    ('batting_average','Batting Average (BA)'),
+    ('on_base_percentage','On Base Percentage (OBP)'),
+    ('batting_average_risp','Batting Average with runners in scoring position (BA/RISP)'),
+    ('slugging','Slugging Percentage (SLG)'),
+    ('on_base_slugging','On Base plus Slugging Percentage (OPS)')]
+pitcher_stats = [("win_pct", 'Winning percentage (W-L%)'),
+    ("earned_run_average",'Earned Run Average (ERA)'),
+    ("walks_per_9",'Walks per 9 innings'),
+    ("hits_per_9",'Hits per 9 innings'),
+    ("strikeouts_per_9",'Strikeouts per 9 innings'),
+    ("home_runs_per_9",'Home Runs per 9 innings'),
+    ("whip",'Walks and Hits per inning pitched (WHIP)'),
+    ("strikeouts_per_walk",'Strikeout-to-Walk ratio')]
+
+def stat_details(statistic):
+    #Returns the category ('batting' or 'pitching') and display name for one of the stats above, or (None, None) if it isn't one.
+    for term in batter_stats:
+        if term[0] == statistic:
+            return 'batting', term[1]
+    for term in pitcher_stats:
+        if term[0] == statistic:
+            return 'pitching', term[1]
+    return None, None
+
+def refresh_hall_of_flame():
+    #Downloads the deceased pool and updates the index with whatever changed.
+    #The download skips the response cache, which would otherwise hand back the same pool for a day.
+    #Only one refresh runs at a time; if one is already going, this returns straight away.
+    if not hall_of_flame_refreshing.acquire(blocking=False):
+        return
     try:
-        app.logger.info(i)
-        paramstr = urllib.parse.urlencode({'category':category, 'season':season, 'playerIds':playerIds})
-        baseurl = 'https://api.blaseball-reference.com/v1/playerStats'
-        request = baseurl+'?'+paramstr
-        requeststr = urllib.request.urlopen(request).read()
-        data = json.loads(requeststr)
-    except urllib.error.URLError as e:
-        if hasattr(e,"code"):
-            print("The server couldn't fulfill the request.")
-            print("Error code: ", e.code)
-        elif hasattr(e,'reason'):
-            print("We failed to reach a server")
-            print("Reason: ", e.reason)
+        changed, removed = hall_of_flame.update(get_pooled_players(fresh = True))
+        app.logger.info(f"Hall of Flame index updated: {changed} changed, {removed} removed")
+    finally:
+        hall_of_flame_refreshing.release()
+
+def refresh_hall_of_flame_in_background():
+    #Runs on a thread of its own, so if the download fails there's nobody to tell but the log.
+    try:
+        refresh_hall_of_flame()
+    except upstream_error as e:
+        app.logger.warning(f"Couldn't refresh the Hall of Flame index: {e}")
+
+def hall_of_flame_roster():
+    #The deceased players without a proper team affiliation, from the index.
+    #The very first request has to wait for the pool to be downloaded; after that, stale data is served while a refresh runs in the background.
+    refreshed = hall_of_flame.refreshed()
+    if refreshed == None:
+        with hall_of_flame_refreshing:
+            if hall_of_flame.refreshed() == None:
+                hall_of_flame.update(get_pooled_players())
+    elif time.time() - max(refreshed, hall_of_flame.attempted() or 0) > HALL_OF_FLAME_REFRESH:
+        #The attempt is recorded up front and shared by every worker, so while upstream is down it's only tried once an interval,
+        #not by every request that finds the index stale.
+        hall_of_flame.attempt()
+        threading.Thread(target=refresh_hall_of_flame_in_background, name='hall-of-flame', daemon=True).start()
+    return hall_of_flame.roster()
+
+def get_roster(team):
+    #Gets the roster for a team or area ID as player_records, along with the name to show for it.
+    return roster_name(team), list(iter_roster(team))
+
+def roster_name(team):
+    #The name to show for a team or area ID's roster.
+    return "Hall of Flame" if team == "Underworld" else team
+
+def iter_roster(team):
+    #Yields the roster for a team or area ID as player_records. Nothing is fetched until the first one is asked for.
+    #The Hall of Flame is not and never was a team. It does not have a roster that can be called.
+    #Since it's just where dead players hang out, we instead just get a list of all deceased players without a proper team affiliation.
+    #Yes, that's an issue. There are dead players who are still playing actively. It makes this rather annoying.
+    if team == "Underworld":
+        filter_roster = hall_of_flame_roster()
     else:
-        return data
+        #You can get the roster for all the other teams, including the Vault, by directly feeding it to Blaseball Reference. Convenient.
+        filter_roster = get_team_roster(team, includeShadows=True)
+    for player in filter_roster:
+        yield player_record(player)
+
+@functools.lru_cache(maxsize=4)
+def league_vibes(season = 23):
+    #Every player on a team in the season, with their team and their vibes for every day, computed once per season.
+    #Returns (players, team names, team index for each player, vibes matrix).
+    if league_data.has_season(season):
+        league = league_data.players(season).rows()
+    else:
+        league = get_players_seasonal(season)
+    players = [player_record(player) for player in league if player['team'] not in [None, 'null']]
+    teams, team_index = np.unique([player.team for player in players], return_inverse=True)
+    return players, teams, team_index, roster_vibes(players)
+
+def fate_vs_stat(category, statistic, season):
+    #Gets the Fate and the given stat of every player in the right position for the category on a main roster in the season.
+    #Reads the precomputed points if there are any, then the local snapshot if the season's been ingested, otherwise Blaseball Reference.
+    #Returns two NumPy arrays, paired up by player id and ready to plot.
+    found = fate_stats.points(statistic, season)
+    if found is not None:
+        return found
+    position = 'BATTER' if category == 'batting' else 'PITCHER'
+    if league_data.has_season(season):
+        players = league_data.players(season)
+        keep = players.equals('position_type', position) & players.equals('current_location', 'main_roster')
+        player_ids = players.column('player_id')[keep]
+        fates = players.numbers('fate')[keep]
+        stats = league_data.stats(category, season)
+        stat_ids = stats.column('player_id')
+        stat_values = stats.numbers(statistic)
+        with metrics.span('join'):
+            ids, fates, stats = fate_stat_join(player_ids, fates, stat_ids, stat_values)
+        return fates, stats
+    playersfate, playerstats = season_stats(category, season)
+    return pair_fate_stat(playersfate, playerstats, statistic)
+
+def season_stats(category, season):
+    #Gets every main roster player in the right position for the category in the season, along with their stats, from Blaseball Reference.
+    #Every stat in a category comes from the same download, so concurrent requests for any of them share it.
+    return flights.do(('season_stats', category, season), lambda: fetch_season_stats(category, season))
+
+def fetch_season_stats(category, season):
+    position = 'BATTER' if category == 'batting' else 'PITCHER'
+    playersfate = main_roster_players(get_players_seasonal(season), position)
+    #The playerStats batches are all requested at once on the prefetcher, so this only waits as long as the slowest one.
+    batches = prefetcher.map(lambda i: get_player_stats(category, season, playersfate[i:i+STATS_BATCH]), range(0, len(playersfate), STATS_BATCH))
+    playerstats = [stat for batch in batches for stat in batch or []]
+    return playersfate, playerstats
+
+def main_roster_players(league, position):
+    #Only keep those who are in the correct position on the main roster.
+    return [player for player in league if player['position_type'] == position and player["current_location"] == "main_roster"]
+
+def pair_fate_stat(playersfate, playerstats, statistic):
+    #Pairs up the Fate and stat of players and stats as returned by Blaseball Reference. Returns two NumPy arrays ready to plot.
+    with metrics.span('join'):
+        ids, fates, stats = fate_stat_join([player['player_id'] for player in playersfate], [player['fate'] for player in playersfate],
+            [stat['player_id'] for stat in playerstats], [float(stat[statistic] or 0.0) for stat in playerstats])
+    return fates, stats
+
+def serve_chart(key, render, format):
+    #Sends a chart in the given format from the chart cache, rendering it first with render(format) if it isn't there.
+    #Charts only depend on their key, so they get a strong ETag and can be cached by browsers and proxies.
+    #A request with a matching If-None-Match gets an empty 304 instead of the image.
+    if format not in FORMATS:
+        abort(404)
+    return chart_response(charts.get_or_render(key + (format,), lambda: render(format)), format)
+
+def chart_response(chart, format):
+    #Turns an (image bytes, etag) pair from the chart cache into a cacheable response.
+    image, etag = chart
+    response = make_response(image)
+    response.mimetype = FORMATS[format]
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = CHART_MAX_AGE
+    return response.make_conditional(request)
+
+class page_stream():
+    #Wraps something a streamed page's template loops over. Once a page has started going out, an upstream failure can't be turned
+    #into an error page any more, so the failure is kept on the stream for the template to report, and the loop just ends early.
+    def __init__(self, items):
+        self.items = items
+        self.error = None
+        self.count = 0
+    def __iter__(self):
+        try:
+            for item in self.items:
+                self.count += 1
+                yield item
+        except upstream_error as e:
+            app.logger.warning(f"Upstream request failed partway through a streamed page: {e}")
+            self.error = e
+
+def streamed_page(template, **context):
+    #Starts sending a page straight away, rendering the rest of the template as the page_streams in it produce their items.
+    #The headers and everything before the first loop go out before anything is fetched.
+    return app.response_class(stream_template(template, **context))
+
+def warm_up():
+    #Loads numpy and matplotlib, which are otherwise only imported by the first request that needs them, and draws a throwaway chart.
+    #Pre-fork servers can call this once in the master (gunicorn.conf.py does), so every worker starts with them ready and shares the memory.
+    np.lazy_load()
+    warm_up_charts()
+
+@app.before_request
+def start_timing():
+    g.timing = metrics.begin_request()
+
+@app.after_request
+def finish_timing(response):
+    #Adds up the request's spans into a Server-Timing header, if that's turned on.
+    token = g.pop('timing', None)
+    if response.is_streamed:
+        #A streamed page does most of its work after this, while the body is going out, so it's timed until the response is closed.
+        #Its headers are gone by then, so it doesn't get a Server-Timing header; the stage histograms still count its spans.
+        endpoint = request.endpoint
+        response.call_on_close(lambda: metrics.end_request(token, endpoint))
+        return response
+    server_timing = metrics.end_request(token, request.endpoint)
+    if server_timing:
+        response.headers['Server-Timing'] = server_timing
+    return response
+
+@app.errorhandler(upstream_error)
+def upstream_failed(e):
+    #Blaseball Reference or Chronicler couldn't give us what we needed, so say so rather than crashing on a missing response.
+    app.logger.warning(f"Upstream request failed: {e}")
+    status = 504 if isinstance(e, upstream_unavailable) else 502
+    return render_template('upstream_error.html',title='Something went wrong upstream',error=e), status
 
 @app.route("/")
 def landing():
@@ -327,233 +789,196 @@ def landing():
 def vleague_list():
     #Grab and display the teams in the league for user selection.
     title = 'Vibe Analysis Tool'
-    data = clean_team_list()
-    outdata = []
-    for team in data:
-        if team.name == "The Hall Stars":
-            #The Hall Stars name has 'The' in it, unlike every other team. This fixes that so it fits into the templates right.
-            team.name = "Hall Stars"
-            app.logger.info(f"***Editing the Hall Stars!")
-        if team.name != "Hall Stars" and team.status != 'active':
-            #Only active teams from the list are displayed.
-            #The Hall Stars are an exception to this, as their roster has seen actual play, unlike other inactive teams.
-            app.logger.info(f"***Removing {team} from roster")
-        else:
-            app.logger.info(f"***{team} remains. They are {team.status}")
-            outdata.append(team)
-    #The Vault and the Hall of Flame are not proper teams, but I'd like the option to analyze players from them.
-    #As such, area-type records for both are generated and added.
-    outdata.append(area_record("Vault", "0x1F947", '698cfc6d-e95e-4391-b754-b87337e4d2a9'))
-    outdata.append(area_record("Hall of Flame", "0x1f480", 'Underworld'))
+    outdata = directory.selection()
     return render_template('vteam_select.html',title=title,data=outdata)
 
 @app.route("/vroster")
 def vroster_printer():
     #Gets the roster for the selected team/area and returns it for user selection.
-    team = request.args.get("selected_team")
-    app.logger.info(f"Getting roster for the {team}")
-    if team == "Underworld":
-        raw_roster = get_pooled_players()
-        filter_roster = []
-        for player in raw_roster:
-            if player['team'] == 'null' or player['team'] == None:
-                filter_roster.append(player)
-        team = "Hall of Flame"
-    else:
-        #You can get the roster for all the other teams, including the Vault, by directly feeding it to Blaseball Reference. Convenient.
-        filter_roster = get_team_roster(team, includeShadows=True)
-    clean_roster = [player_record(player) for player in filter_roster]
-    return render_template('vroster_return.html',title=f"Roster for the {team}",roster=clean_roster,team=team)
+    team_id = request.args.get("selected_team")
+    app.logger.info(f"Getting roster for the {team_id}")
+    team = roster_name(team_id)
+    chart_url = url_for('roster_vibes_image', team_id=team_id, format='png')
+    return streamed_page('vroster_return.html',title=f"Roster for the {team}",roster=page_stream(iter_roster(team_id)),team=team,chart_url=chart_url)
 
 @app.route("/gvibes")
 def vibe_charts():
     #Generates the chart of the selected player's vibes over the course of a hypothetical season.
     id = request.args.get("selected_player")
     player = player_record(get_player(id))
-    #Vibes aren't stored on any accessible APIs, but its formula is visible on the front-end of the Blaseball website.
-    #We can use this to recreate a player's vibes using stats that actually are stored.
-    frequency = 6 + round(10 * player.buoyancy)
-    range = 0.5 * (player.pressurization + player.cinnamon)
-    x = np.arange(99)
-    y = (range * np.sin(np.pi * ((2 / frequency) * x + 0.5))) - (0.5 * player.pressurization) + (0.5 * player.cinnamon)
-    plt.plot(x, y)
-    plt.xlabel('Day')
-    plt.ylabel('Vibes')
-    plt.xlim(0, 100)
-    plt.ylim(-2.0, 2.0)
-    #We can't simply save the image to the server then call it by local url, since that'd be a security risk.
-    #This necessitates that I instead convert the image to a base64 string, which can be fed directly to the jinja template and then turned back into an image there.
-    #Utter clownery.
-    #Code adapted from https://stackoverflow.com/questions/38061267/matplotlib-graphic-image-to-base64
-    #Corresponding HTML adapted from https://stackoverflow.com/questions/31492525/converting-matplotlib-png-to-base64-for-viewing-in-html-template
-    chart_bytes = BytesIO()
-    plt.savefig(chart_bytes, format='jpg')
-    plt.close()
-    chart_bytes.seek(0)
-    chart_base64 = base64.b64encode(chart_bytes.read())
-    chart_bytes.close()
-    return render_template('vibechart_template.html',title=f"Summary of {player.name}",player=player, graph=chart_base64.decode('utf8'))
+    chart_url = url_for('vibes_chart_image', player_id=player.id, format='jpg')
+    return render_template('vibechart_template.html',title=f"Summary of {player.name}",player=player, chart_url=chart_url)
+
+@app.route("/chart/vibes/<player_id>.<format>")
+def vibes_chart_image(player_id, format):
+    #The vibes chart for a player on its own, so it can be cached by the browser (or a proxy) separately from the page.
+    #format can be jpg, png or svg.
+    return serve_chart(('vibes', player_id), lambda format: render_vibes_chart(player_record(get_player(player_id)), format), format)
+
+@app.route("/chart/roster_vibes/<team_id>.<format>")
+def roster_vibes_image(team_id, format):
+    #Heatmap of the vibes of everyone on a team's roster, for every day of the season.
+    def render(format):
+        team, roster = get_roster(team_id)
+        return render_roster_vibes([player.name for player in roster], roster_vibes(roster), f"Vibes for the {team}", format)
+    return serve_chart(('roster_vibes', team_id), render, format)
+
+@app.route("/api/vibes")
+def vibes_json():
+    #The vibes of every player on a team's roster for every day of the season, as JSON.
+    #If a day is given, also says who has the best and worst vibes on it.
+    team_id = request.args.get("team")
+    if not team_id:
+        abort(400)
+    team, roster = get_roster(team_id)
+    matrix = roster_vibes(roster)
+    output = {'team': team, 'days': DAYS, 'players': [{'id': player.id, 'name': player.name, 'vibes': row} for player, row in zip(roster, matrix.tolist())]}
+    day = request.args.get("day", type=int)
+    if day != None and roster:
+        if not 0 <= day < DAYS:
+            abort(400)
+        best, worst = day_extremes(matrix, day)
+        output['day'] = day
+        output['best'] = roster[best].id
+        output['worst'] = roster[worst].id
+    return output
+
+@app.route("/api/vibes/extremes")
+def vibes_extremes_json():
+    #The players with the best and worst vibes on every team for a given day of the season, as JSON.
+    day = request.args.get("day", default=0, type=int)
+    season = request.args.get("season", default=24, type=int)-1
+    if not 0 <= day < DAYS:
+        abort(400)
+    players, teams, team_index, matrix = league_vibes(season)
+    column = matrix[:, day]
+    output = {}
+    if players:
+        found, best, worst = group_extremes(team_index, column)
+        for team, high, low in zip(found.tolist(), best.tolist(), worst.tolist()):
+            output[str(teams[team])] = {'best': {'id': players[high].id, 'name': players[high].name, 'vibes': float(column[high])},
+                'worst': {'id': players[low].id, 'name': players[low].name, 'vibes': float(column[low])}}
+    return {'season': season+1, 'day': day, 'teams': output}
 
 @app.route("/fteam")
 def fleague_list():
     #Grab and display the teams in the league for user selection.
     title = 'Fate History Tool'
-    data = clean_team_list()
-    outdata = []
-    for team in data:
-        if team.name == "The Hall Stars":
-            team.name = "Hall Stars"
-            #The Hall Stars name has 'The' in it, unlike every other team. This fixes that so it fits into the templates right.
-            app.logger.info(f"***Editing the Hall Stars!")
-        if team.name != "Hall Stars" and team.status != 'active':
-            #Only active teams from the list are displayed.
-            #The Hall Stars are an exception to this, as their roster has seen actual play, unlike other inactive teams.
-            app.logger.info(f"***Removing {team} from roster")
-        else:
-            app.logger.info(f"***{team} remains. They are {team.status}")
-            outdata.append(team)
-    #The Vault and the Hall of Flame are not proper teams, but I'd like the option to analyze players from them.
-    #As such, area-type records for both are generated and added.
-    outdata.append(area_record("Vault", "0x1F947", '698cfc6d-e95e-4391-b754-b87337e4d2a9'))
-    outdata.append(area_record("Hall of Flame", "0x1f480", id = 'Underworld'))
+    outdata = directory.selection()
     return render_template('fteam_select.html',title=title,data=outdata)
 
 @app.route("/froster")
 def froster_printer():
     #Gets the roster for the selected team/area and returns it for user selection.
     team = request.args.get("selected_team")
-    print(team)
     app.logger.info(f"Getting roster for the {team}")
-    #The Hall of Flame is not and never was a team. It does not have a roster that can be called.
-    #Since it's just where dead players hang out, we instead just get a list of all deceased players without a proper team affiliation.
-    #Yes, that's an issue. There are dead players who are still playing actively. It makes this rather annoying.
-    if team == "Underworld":
-        raw_roster = get_pooled_players()
-        filter_roster = []
-        for player in raw_roster:
-            if player['team'] == 'null' or player['team'] == None:
-                filter_roster.append(player)
-        team = "Hall of Flame"
-    else:
-        #You can get the roster for all the other teams, including the Vault, by directly feeding it to Blaseball Reference. Convenient.
-        filter_roster = get_team_roster(team, includeShadows=True)
-    clean_roster = [player_record(player) for player in filter_roster]
-    return render_template('froster_return.html',title=f"Roster for the {team}",roster=clean_roster,team=team)
+    roster = page_stream(iter_roster(team))
+    team = roster_name(team)
+    return streamed_page('froster_return.html',title=f"Roster for the {team}",roster=roster,team=team)
 
 @app.route("/fhist")
 def fate_summary():
     #Get the selected player's history of Fate changes, and display the summary.
+    #The page is streamed, so the explanation and the first changes show up while later pages of the player's history are still being fetched.
     player_id = request.args.get("selected_player")
-    hist = get_full_player_history(player_id)
-    fate_hist = fate_filtered_history(hist)
-    return render_template('fate_history.html',title=f"Vibe summary for {fate_hist[0].name}",history=fate_hist, length = len(fate_hist))
+    #Team names are looked up while the page streams, so the team list is loaded first. If that fails, it gets the error page
+    #instead of cutting the page off after a 200.
+    directory.teams()
+    name = latest_player_name(player_id)
+    return streamed_page('fate_history.html',title=f"Vibe summary for {name}" if name else "Fate summary",name=name,
+        history=page_stream(streamed_fate_history(player_id)), team_name = directory.name)
+
+@app.route("/fchanges")
+def fate_change_list():
+    #Lists every Fate change in the league with the chosen cause ('feedback', 'alternate' or 'unknown'), or every change if none is chosen.
+    cause = request.args.get("cause")
+    if cause != None and cause not in CHANGE_CAUSES.values():
+        abort(404)
+    changes = league_fate_changes.listing(cause)
+    return render_template('fate_changes.html',title="Fate changes" if cause == None else f"Fate changes ({cause})",changes=changes,cause=cause,
+        counts=league_fate_changes.counts(),scanned=league_fate_changes.finished(),team_name=directory.name)
+
+@app.route("/api/fate_changes")
+def fate_changes_json():
+    #The league-wide Fate-change table as JSON, optionally filtered by cause. limit and offset page through it, oldest change first.
+    cause = request.args.get("cause")
+    if cause != None and cause not in CHANGE_CAUSES.values():
+        abort(404)
+    limit = request.args.get("limit", type=int)
+    offset = request.args.get("offset", 0, type=int)
+    return {'cause': cause, 'counts': league_fate_changes.counts(), 'changes': league_fate_changes.listing(cause, limit, offset)}
 
 @app.route("/fseason")
 def scatter_definer():
     #Prompt the user to select a performance stat to analyze against and a season to draw data from.
-    batter_stats = [('doubles', 'Doubles'),
-    ('triples','Triples'),
-    ('home_runs','Home Runs (HR)'),
-    ('runs_batted_in','Runs batted in (RBI)'),
-    ('walks','Walks (Bases on Balls)'),
-    ('strikeouts','Strikeouts'),
-    ('batting_average','Batting Average (BA)'),
-    ('on_base_percentage','On Base Percentage (OBP)'),
-    ('batting_average_risp','Batting Average with runners in scoring position (BA/RISP)'),
-    ('slugging','Slugging Percentage (SLG)'),
-    ('on_base_slugging','On Base plus Slugging Percentage (OPS)')]
-    pitcher_stats = [("win_pct", 'Winning percentage (W-L%)'),
-    ("earned_run_average",'Earned Run Average (ERA)'),
-    ("walks_per_9",'Walks per 9 innings'),
-    ("hits_per_9",'Hits per 9 innings'),
-    ("strikeouts_per_9",'Strikeouts per 9 innings'),
-    ("home_runs_per_9",'Home Runs per 9 innings'),
-    ("whip",'Walks and Hits per inning pitched (WHIP)'),
-    ("strikeouts_per_walk",'Strikeout-to-Walk ratio')]
     return render_template('scatter_definer.html',title=f"Fate Comparison Tool",batter_stats=batter_stats,pitcher_stats=pitcher_stats)
 
 @app.route("/fscatter")
 def fate_scatter():
-    #get all players, filter out to only include players in correct position for stat, get stats for all players
-    batter_stats = [('doubles', 'Doubles'),
-    ('triples','Triples'),
-    ('home_runs','Home Runs (HR)'),
-    ('runs_batted_in','Runs batted in (RBI)'),
-    ('walks','Walks (Bases on Balls)'),
-    ('strikeouts','Strikeouts'),
-    ('batting_average','Batting Average (BA)'),
-    ('on_base_percentage','On Base Percentage (OBP)'),
-    ('batting_average_risp','Batting Average with runners in scoring position (BA/RISP)'),
-    ('slugging','Slugging Percentage (SLG)'),
-    ('on_base_slugging','On Base plus Slugging Percentage (OPS)')]
-    pitcher_stats = [("win_pct", 'Winning percentage (W-L%)'),
-    ("earned_run_average",'Earned Run Average (ERA)'),
-    ("walks_per_9",'Walks per 9 innings'),
-    ("hits_per_9",'Hits per 9 innings'),
-    ("strikeouts_per_9",'Strikeouts per 9 innings'),
-    ("home_runs_per_9",'Home Runs per 9 innings'),
-    ("whip",'Walks and Hits per inning pitched (WHIP)'),
-    ("strikeouts_per_walk",'Strikeout-to-Walk ratio')]
-    raw_batter_stats = ['doubles','triples','home_runs','runs_batted_in','walks', 'strikeouts', 'batting_average', 'on_base_percentage', 'batting_average_risp', 'slugging', 'on_base_slugging']
+    #Shows the Fate vs. stat chart for the chosen stat and season. The chart itself is drawn by scatter_chart_image.
     statistic = request.args.get("selected_stat")
     season = int(request.args.get("season"))-1
-    #get all players for the chosen season
-    league = get_players_seasonal(season)
-    playersfate = []
-    #Go over the list of players. Only keep those who are in the correct position on the main roster.
-    if statistic in raw_batter_stats:
-        category = 'batting'
-        for player in league:
-            if player['position_type'] == 'BATTER' and player["current_location"] == "main_roster":
-                playersfate.append(player)
-        for term in batter_stats:
-            if term[0] == statistic:
-                cleanstat = term[1]
+    category, cleanstat = stat_details(statistic)
+    if category == None:
+        abort(404)
+    chart_url = url_for('scatter_chart_image', statistic=statistic, season=season+1, format='jpg')
+    #If the season's been analyzed ahead of time, the page also gets the correlation and a link to how it changes over the seasons.
+    cell = fate_stats.cell(statistic, season)
+    trend_url = url_for('fate_trend_image', statistic=statistic, format='png') if cell else None
+    return render_template('fate_scatter.html',title=f"{cleanstat} as compared to Fate in season {season+1}", chart_url=chart_url, cell=cell, trend_url=trend_url, cleanstat=cleanstat)
+
+@app.route("/chart/scatter/<statistic>/<int:season>.<format>")
+def scatter_chart_image(statistic, season, format):
+    #The Fate scatter chart for a stat and season on its own, so it can be cached separately from the page.
+    #season is the season number as shown on the site, like the /fscatter form uses.
+    category, cleanstat = stat_details(statistic)
+    if category == None:
+        abort(404)
+    #The tables' version is in the key, so a rebuild (a new league snapshot, say) doesn't keep serving charts drawn from the old data.
+    key = ('scatter', statistic, season, fate_stats.version())
+    def render(format):
+        fates, stats = fate_vs_stat(category, statistic, season-1)
+        app.logger.info(len(stats))
+        return render_fate_scatter(fates, stats, cleanstat, season-1, format)
+    #A new chart tends to get linked and requested by lots of people at once, so it's only drawn once for all of them.
+    return serve_chart(key, lambda format: flights.do(key + (format,), lambda: render(format)), format)
+
+@app.route("/api/fate_stats")
+def fate_stats_json():
+    #The precomputed Fate-vs-stat analysis as JSON. With a season (numbered as on the site), just that season's correlation, fit and binned means;
+    #without one, the correlation and fit for every season.
+    statistic = request.args.get("stat")
+    season = request.args.get("season", type=int)
+    if season == None:
+        found = fate_stats.trend(statistic)
     else:
-        category = 'pitching'
-        for player in league:
-            if player['position_type'] == 'PITCHER' and player["current_location"] == "main_roster":
-                playersfate.append(player)
-        for term in pitcher_stats:
-            if term[0] == statistic:
-                cleanstat = term[1]
-    #Get the stats for all remaining players.
-    playerstats = get_player_stats(category, season, playersfate)
-    #Sort both lists by player id to ensure that the right values are paired together.
-    playersfate = sorted(playersfate, key = lambda i: i['player_id'], reverse=True)
-    playerstats = sorted(playerstats, key = lambda i: (i['player_id'], float(i[statistic]or 0.0)), reverse=True)
-    #matplotlib can't handle lists of dictionaries, so convert both of them into a dictionary of lists.
-    graph_inputs = {'fate':[], 'stat':[]}
-    active = []
-    last_player = None
-    
-    for player in playerstats:
-        #the stat list includes records for all the teams a player played for separate from each other. Only the highest stat is kept.
-        if last_player == player['player_id']:
-            graph_inputs['stat'][-1]=(float(player[statistic] or 0.0))
-        else:
-            graph_inputs['stat'].append(float(player[statistic] or 0.0))
-        last_player = player['player_id']
-        active.append(player['player_id'])
-    for player in playersfate:
-        if player['player_id'] in active:
-            graph_inputs['fate'].append(player['fate'])
-    app.logger.info(len(playerstats))
-    app.logger.info(len(graph_inputs['stat']))
-    with open("test.txt", "w") as text_file:
-        text_file.write(pretty(graph_inputs))
-    #Finally graph the thing and feed it to the template.
-    plt.scatter(x=graph_inputs['fate'], y=graph_inputs['stat'])
-    plt.xlabel('Fate')
-    plt.ylabel(cleanstat)
-    plt.title(f'{cleanstat} as compared to Fate in season {season+1}')
-    chart_bytes = BytesIO()
-    plt.savefig(chart_bytes, format='jpg')
-    plt.close()
-    chart_bytes.seek(0)
-    chart_base64 = base64.b64encode(chart_bytes.read())
-    chart_bytes.close()
-    return render_template('fate_scatter.html',title=f"{cleanstat} as compared to Fate in season {season+1}", graph=chart_base64.decode('utf8'))
+        found = fate_stats.cell(statistic, season-1)
+    if found == None:
+        abort(404)
+    return found
+
+@app.route("/chart/fate_trend/<statistic>.<format>")
+def fate_trend_image(statistic, format):
+    #Line chart of a stat's correlation with Fate across every analyzed season.
+    category, cleanstat = stat_details(statistic)
+    trend = fate_stats.trend(statistic)
+    if category == None or trend == None:
+        abort(404)
+    #Keyed on the tables' version too, so a rebuilt analysis gets a new chart.
+    return serve_chart(('fate_trend', statistic, fate_stats.version()), lambda format: render_fate_trend(trend['seasons'], trend['r'], cleanstat, format), format)
+
+@app.route("/cache/stats")
+def cache_stats():
+    #Hit/miss counters for the upstream response cache and the chart cache, and how many requests shared a fetch already in flight.
+    return {'responses': cache.stats(), 'charts': charts.stats(), 'coalesced': flights.stats()}
+
+@app.route("/metrics")
+def metrics_page():
+    #Stage, route and upstream timings in Prometheus' text format.
+    response = make_response(metrics.exposition())
+    response.mimetype = 'text/plain'
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    return response
 
 if __name__ == "__main__":
     app.run(host="localhost", port=8080, debug=True)
@@ -0,0 +1,55 @@
+#What a burst of identical /fhist requests costs upstream, with and without coalescing of in-flight fetches.
+#Each round sends a burst of simultaneous requests for one player nobody has asked about yet, so nothing is in the caches or the Fate index.
+#Usage: python benchmarks/bench_coalescing.py [burst size] [upstream latency seconds] [updates per player]
+import os, sys, time, tempfile, threading, statistics, logging, urllib.request
+from concurrent.futures import ThreadPoolExecutor
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, '..'))
+from stub_upstream import stub_server
+from fake_upstream import chronicler_routes
+from single_flight import flight
+
+class no_flight():
+    #Stands in for single_flight, running every call on its own.
+    def join(self, key):
+        return flight(), True
+    def land(self, key, found, result = None, error = None):
+        pass
+    def do(self, key, function):
+        return function()
+    def stats(self):
+        return {}
+
+if __name__ == "__main__":
+    burst = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    updates = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+    server = stub_server(chronicler_routes(updates), latency = latency).start()
+    scratch = tempfile.mkdtemp()
+    os.environ.update(CHRONICLER_URL = server.url, REFERENCE_URL = server.url, UPSTREAM_PER_HOST_LIMIT = '64',
+        BLASEBALL_CACHE_PATH = os.path.join(scratch, 'cache.sqlite3'), BLASEBALL_INDEX_PATH = os.path.join(scratch, 'index.sqlite3'))
+    from werkzeug.serving import make_server
+    import application
+    application.app.logger.disabled = True
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    #The stub doesn't serve /v2/teams, so the team directory starts out with an empty team list.
+    application.directory.seasons[23] = {'teams': [], 'selection': [], 'by_id': {}}
+    app_server = make_server('127.0.0.1', 0, application.app, threaded = True)
+    threading.Thread(target = app_server.serve_forever, daemon = True).start()
+    url = f"http://127.0.0.1:{app_server.server_port}/fhist?selected_player="
+    print(f"bursts of {burst} requests, upstream latency {latency*1000:.0f} ms, {updates} updates per player")
+    for name, flights in [('without coalescing', no_flight()), ('with coalescing', application.flights)]:
+        application.flights = flights
+        player = f"player-{name.replace(' ', '-')}"
+        before = sum(server.hits.values())
+        def one(_):
+            start = time.perf_counter()
+            with urllib.request.urlopen(url + player, timeout = 300) as response:
+                response.read()
+            return time.perf_counter() - start
+        with ThreadPoolExecutor(burst) as pool:
+            latencies = sorted(pool.map(one, range(burst)))
+        upstream = sum(server.hits.values()) - before
+        print(f"{name:>20}: {upstream:5} upstream requests, p50 {statistics.median(latencies)*1000:7.0f} ms, max {latencies[-1]*1000:7.0f} ms")
+    app_server.shutdown()
+    server.stop()
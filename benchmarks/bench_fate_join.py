@@ -0,0 +1,63 @@
+#Times the Fate-vs-stat join in fate_scatter: the old sort-and-walk over lists of dicts against the array-based fate_stat_join.
+#Also checks both against a plain dict join, since the old version misaligns Fate and stat when the two lists don't line up.
+#Usage: python benchmarks/bench_fate_join.py [players] [repeats]
+import os, sys, time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from fate_analysis import fate_stat_join
+from fixtures import synthetic_league, synthetic_stats
+
+def old_join(playersfate, playerstats, statistic):
+    #The join fate_scatter used to do, kept here for comparison.
+    playersfate = sorted(playersfate, key = lambda i: i['player_id'], reverse=True)
+    playerstats = sorted(playerstats, key = lambda i: (i['player_id'], float(i[statistic]or 0.0)), reverse=True)
+    graph_inputs = {'fate':[], 'stat':[]}
+    active = []
+    last_player = None
+    for player in playerstats:
+        if last_player == player['player_id']:
+            graph_inputs['stat'][-1]=(float(player[statistic] or 0.0))
+        else:
+            graph_inputs['stat'].append(float(player[statistic] or 0.0))
+        last_player = player['player_id']
+        active.append(player['player_id'])
+    for player in playersfate:
+        if player['player_id'] in active:
+            graph_inputs['fate'].append(player['fate'])
+    return graph_inputs['fate'], graph_inputs['stat']
+
+def new_join(playersfate, playerstats, statistic):
+    ids, fates, stats = fate_stat_join([player['player_id'] for player in playersfate], [player['fate'] for player in playersfate],
+        [stat['player_id'] for stat in playerstats], [float(stat[statistic] or 0.0) for stat in playerstats])
+    return fates, stats
+
+def expected_pairs(playersfate, playerstats, statistic):
+    best = {}
+    for stat in playerstats:
+        value = float(stat[statistic] or 0.0)
+        best[stat['player_id']] = max(best.get(stat['player_id'], value), value)
+    return sorted((player['fate'], best[player['player_id']]) for player in playersfate if player['player_id'] in best)
+
+def timed(function, repeats, *args):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = function(*args)
+    return (time.perf_counter() - start) / repeats, result
+
+if __name__ == "__main__":
+    players = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    league = synthetic_league(players)
+    playersfate = [player for player in league if player['position_type'] == 'BATTER' and player['current_location'] == 'main_roster']
+    #Stats come back for the whole league, so some of them have no main-roster row to pair with.
+    playerstats = synthetic_stats('batting', [player for player in league if player['position_type'] == 'BATTER'])
+    expected = expected_pairs(playersfate, playerstats, 'slugging')
+    #numpy is only imported the first time fate_analysis uses it, so one untimed run keeps the import out of the numbers.
+    new_join(playersfate, playerstats, 'slugging')
+    old_time, (old_fates, old_stats) = timed(old_join, repeats, playersfate, playerstats, 'slugging')
+    new_time, (new_fates, new_stats) = timed(new_join, repeats, playersfate, playerstats, 'slugging')
+    old_ok = len(old_fates) == len(old_stats) and sorted(zip(old_fates, old_stats)) == expected
+    new_ok = sorted(zip(new_fates.tolist(), new_stats.tolist())) == expected
+    print(f"{len(playersfate)} players, {len(playerstats)} stat rows, {len(expected)} pairs")
+    print(f"old join: {old_time*1000:9.2f} ms   aligned: {old_ok} ({len(old_fates)} fates, {len(old_stats)} stats)")
+    print(f"new join: {new_time*1000:9.2f} ms   aligned: {new_ok}")
+    print(f"speedup:  {old_time / new_time:.1f}x")
@@ -0,0 +1,30 @@
+#How fast fate_scan.py gets through a league with different numbers of worker processes and download threads,
+#against a one-player-at-a-time baseline (one fetcher, one process). Every configuration rebuilds the whole table from scratch into its own index.
+#The fake's histories are generated once up front, so only the scan itself is timed.
+#Usage: python benchmarks/bench_fate_scan.py [players] [updates per player] [upstream latency seconds]
+import os, sys, time, tempfile, subprocess, urllib.request
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, '..'))
+from fake_upstream import fake_upstream
+
+if __name__ == "__main__":
+    players = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    updates = int(sys.argv[2]) if len(sys.argv) > 2 else 3000
+    latency = float(sys.argv[3]) if len(sys.argv) > 3 else 0.05
+    server, source = fake_upstream(latency, players, updates)
+    ids = [player['player_id'] for player in source.players(23)]
+    for id in ids:
+        urllib.request.urlopen(f"{server.url}/players/updates?player={id}&count=1").read()
+    scratch = tempfile.mkdtemp()
+    print(f"{players} players, {updates} updates each, upstream latency {latency*1000:.0f} ms")
+    cpus = os.cpu_count()
+    for run, (processes, fetchers) in enumerate([(1, 1), (1, 16), (cpus, 16), (cpus, 32)]):
+        env = dict(os.environ, CHRONICLER_URL = server.url, REFERENCE_URL = server.url, METRICS_ENABLED = '0',
+            BLASEBALL_CACHE_PATH = os.path.join(scratch, 'cache.sqlite3'), BLASEBALL_INDEX_PATH = os.path.join(scratch, f"index-{run}.sqlite3"),
+            LEAGUE_DATA_PATH = os.path.join(scratch, 'league_data'), TEAM_REFRESH_INTERVAL = '0')
+        start = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(here, '..', 'fate_scan.py'), '--players', ','.join(ids), '--processes', str(processes),
+            '--fetchers', str(fetchers), '--per-host', '16'], env = env, check = True, stdout = subprocess.DEVNULL)
+        elapsed = time.perf_counter() - start
+        print(f"{processes:>3} processes, {fetchers:>3} fetchers: {elapsed:7.2f} s, {players / elapsed:6.1f} players/s")
+    server.stop()
@@ -0,0 +1,43 @@
+#How many concurrent /fhist requests one app process can keep up with, against a local stub of Chronicler.
+#Every request is for a different player, so nothing comes out of the caches or the Fate index.
+#The page is streamed, so each latency here is the time to the end of the page (bench_ttfb.py measures the time to its first byte).
+#Usage: python benchmarks/bench_fhist_concurrency.py [upstream latency seconds] [updates per player]
+import os, sys, time, tempfile, threading, statistics, logging, urllib.request
+from concurrent.futures import ThreadPoolExecutor
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, '..'))
+from stub_upstream import stub_server
+from fake_upstream import chronicler_routes
+
+if __name__ == "__main__":
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else 0.05
+    updates = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    server = stub_server(chronicler_routes(updates), latency = latency).start()
+    scratch = tempfile.mkdtemp()
+    os.environ.update(CHRONICLER_URL = server.url, REFERENCE_URL = server.url, UPSTREAM_PER_HOST_LIMIT = '64',
+        BLASEBALL_CACHE_PATH = os.path.join(scratch, 'cache.sqlite3'), BLASEBALL_INDEX_PATH = os.path.join(scratch, 'index.sqlite3'))
+    from werkzeug.serving import make_server
+    import application
+    application.app.logger.disabled = True
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    #The team names on the page come from /v2/teams, which the stub doesn't serve, so the team directory starts out with an empty team list.
+    application.directory.seasons[23] = {'teams': [], 'selection': [], 'by_id': {}}
+    app_server = make_server('127.0.0.1', 0, application.app, threaded = True)
+    threading.Thread(target = app_server.serve_forever, daemon = True).start()
+    url = f"http://127.0.0.1:{app_server.server_port}/fhist?selected_player="
+    counter = iter(range(10**9))
+    print(f"upstream latency {latency*1000:.0f} ms, {updates} updates per player")
+    for concurrency in [1, 4, 16, 32]:
+        requests = concurrency * 2
+        def one(_):
+            start = time.perf_counter()
+            with urllib.request.urlopen(url + f"player-{next(counter)}", timeout = 120) as response:
+                response.read()
+            return time.perf_counter() - start
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            latencies = sorted(pool.map(one, range(requests)))
+        elapsed = time.perf_counter() - start
+        print(f"concurrency {concurrency:3}: {requests / elapsed:6.1f} req/s, p50 {statistics.median(latencies)*1000:7.0f} ms, max {latencies[-1]*1000:7.0f} ms")
+    app_server.shutdown()
+    server.stop()
@@ -0,0 +1,31 @@
+#Compares the pooled keep-alive client against a fresh urlopen per call, against a local stub server.
+#Usage: python benchmarks/bench_http_client.py [requests] [threads] [latency seconds]
+import os, sys, time, urllib.request
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from http_client import http_client
+from stub_upstream import stub_server
+
+def payload(query):
+    return {'nextPage': None, 'data': [{'id': i, 'fate': i % 100} for i in range(200)]}
+
+def run(label, fetch, url, requests, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        for body in pool.map(lambda i: fetch(f"{url}/players/updates?player={i}"), range(requests)):
+            assert body
+    elapsed = time.perf_counter() - start
+    print(f"{label:>10}: {requests} requests in {elapsed:.3f}s ({requests / elapsed:.0f} req/s)")
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    latency = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+    server = stub_server({'/players/updates': payload}, latency = latency).start()
+    client = http_client(per_host_limit = threads)
+    try:
+        run('urlopen', lambda url: urllib.request.urlopen(url, timeout = 30).read(), server.url, requests, threads)
+        run('pooled', client.get, server.url, requests, threads)
+    finally:
+        client.close()
+        server.stop()
@@ -0,0 +1,40 @@
+#Times every installed JSON backend in json_codec on payloads shaped like the app's biggest upstream responses:
+#a 1000-update Chronicler page, a season's /v2/players list, and a season's worth of playerStats.
+#Also times decoding a Chronicler page all the way into player_chronicle records, since that's what /fhist actually does with it.
+#Usage: python benchmarks/bench_json.py [repeats]
+import os, sys, json, time, tempfile
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, '..'))
+from fixtures import synthetic_history, synthetic_league, synthetic_stats
+
+def best_time(function, repeats):
+    best = float('inf')
+    for i in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    scratch = tempfile.mkdtemp()
+    os.environ.update(BLASEBALL_CACHE_PATH = os.path.join(scratch, 'cache.sqlite3'), BLASEBALL_INDEX_PATH = os.path.join(scratch, 'index.sqlite3'))
+    import json_codec, application
+    league = synthetic_league(3000)
+    #Encoded the way the upstream APIs send them.
+    payloads = {'chronicler page': json.dumps({'nextPage': 'x', 'data': synthetic_history('0f0e0d0c-0b0a-4908-8706-050403020100', 1000)}).encode('utf8'),
+        'season players': json.dumps(league).encode('utf8'),
+        'season stats': json.dumps(synthetic_stats('batting', league)).encode('utf8')}
+    print(f"backends installed: {', '.join(json_codec.BACKENDS)} (app is using {json_codec.BACKEND})")
+    for name, payload in payloads.items():
+        results = []
+        for backend, loads in json_codec.BACKENDS.items():
+            assert loads(payload) == json.loads(payload)
+            results.append((backend, best_time(lambda: loads(payload), repeats)))
+        baseline = results[-1][1]
+        for backend, elapsed in results:
+            print(f"{name:>16} ({len(payload) / 1e6:4.1f} MB) {backend:>8}: {elapsed*1000:7.2f} ms, {len(payload) / elapsed / 1e6:6.0f} MB/s, {baseline / elapsed:4.1f}x json")
+    page = payloads['chronicler page']
+    for backend, loads in json_codec.BACKENDS.items():
+        elapsed = best_time(lambda: [application.player_chronicle(entry) for entry in loads(page)['data']], repeats)
+        print(f"{'page to records':>23} {backend:>8}: {elapsed*1000:7.2f} ms")
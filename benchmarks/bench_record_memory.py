@@ -0,0 +1,79 @@
+#Memory used by a player's stat updates, with the old plain-object player_chronicle and the __slots__ one in application.py.
+#Measures the history as a full list (like get_full_player_history) and streamed page by page through the Fate filter,
+#starting from the encoded Chronicler pages so the decoded JSON is counted too.
+#Usage: python benchmarks/bench_record_memory.py [updates]
+import os, sys, json, tracemalloc, tempfile
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, '..'))
+from fixtures import synthetic_history
+
+class legacy_chronicle():
+    #player_chronicle as it was before it got __slots__, kept here as the baseline.
+    def __init__(self, dict):
+        self.fateChange = None
+        self.name = dict["data"]["name"]
+        self.timestamp = dict["lastSeen"]
+        self.date = self.timestamp[0:10]
+        self.time = self.timestamp[11:19]
+        if "leagueTeamId" in dict["data"]:
+            self.teamID = dict["data"]["leagueTeamId"]
+        else:
+            self.teamID = "NOT YET TRACKED"
+        if "ritual" in dict["data"]:
+            self.ritual = dict["data"]["ritual"]
+        else:
+            self.ritual = "NOT YET TRACKED"
+        self.id = dict["playerId"]
+        if "fate" in dict["data"]:
+            if dict["data"]["fate"]:
+                self.fate = int(dict["data"]["fate"])
+            else:
+                self.fate = "none, according to the API. In reality, they likely had one that just wasn't tracked. Chronicler is inconsistent at times"
+        else:
+            self.fate = "not yet tracked by Chronicler"
+        self.modifications = []
+        for key in ["gameAttr","permAttr","seasAttr","weekAttr"]:
+            if key in dict["data"]:
+                for mod in dict["data"][key]:
+                    self.modifications.append(mod)
+
+def decoded(pages):
+    for page in pages:
+        yield json.loads(page)
+
+def measure(function):
+    #Returns (memory still held by what function returns, peak while it ran), in bytes.
+    tracemalloc.start()
+    result = function()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current, peak
+
+if __name__ == "__main__":
+    updates = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    scratch = tempfile.mkdtemp()
+    os.environ.update(BLASEBALL_CACHE_PATH = os.path.join(scratch, 'cache.sqlite3'), BLASEBALL_INDEX_PATH = os.path.join(scratch, 'index.sqlite3'))
+    import application
+    history = synthetic_history('0f0e0d0c-0b0a-4908-8706-050403020100', updates)
+    #Encoded the way Chronicler sends them, 1000 updates a page.
+    pages = [json.dumps(history[i:i+1000]).encode('utf8') for i in range(0, updates, 1000)]
+    del history
+    print(f"{updates} updates in {len(pages)} pages of {sum(len(page) for page in pages) / 1e6:.1f} MB")
+    for name, record in [('plain objects', legacy_chronicle), ('__slots__', application.player_chronicle)]:
+        application.modification_sets.clear()
+        def full_list():
+            #All the pages decoded and flattened, as the original get_full_player_history did.
+            output = [json.loads(page) for page in pages]
+            flatput = [record(entry) for page in output for entry in page]
+            return flatput
+        current, peak = measure(full_list)
+        print(f"{name:>14}: full list holds {current / 1e6:6.1f} MB ({current / updates:5.0f} B per update), peak {peak / 1e6:6.1f} MB")
+    def streamed():
+        tracker = application.fate_tracker()
+        #An empty roster timeline, so the changes that need one don't go upstream for it.
+        tracker.timeline = application.roster_timeline([])
+        tracker.feed(application.player_chronicle(entry) for page in decoded(pages) for entry in page)
+        return tracker.output
+    current, peak = measure(streamed)
+    print(f"{'streamed':>14}: Fate filter holds {current / 1e3:6.1f} kB, peak {peak / 1e6:6.1f} MB")
@@ -0,0 +1,53 @@
+#Measures chart renders per second with the Figure/Agg renderer under different numbers of threads,
+#next to the old pyplot drawing (single thread only, since pyplot isn't safe to share between threads).
+#Usage: python benchmarks/bench_rendering.py [renders per run] [format]
+import os, sys, time
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+from rendering import render_vibes_chart, render_fate_scatter
+
+def players(count):
+    rng = np.random.default_rng(0)
+    return [SimpleNamespace(buoyancy=b, pressurization=p, cinnamon=c) for b, p, c in rng.uniform(0, 1.5, (count, 3))]
+
+def pyplot_vibes(player, format):
+    #The drawing /gvibes used to do.
+    frequency = 6 + round(10 * player.buoyancy)
+    range = 0.5 * (player.pressurization + player.cinnamon)
+    x = np.arange(99)
+    y = (range * np.sin(np.pi * ((2 / frequency) * x + 0.5))) - (0.5 * player.pressurization) + (0.5 * player.cinnamon)
+    plt.plot(x, y)
+    plt.xlabel('Day')
+    plt.ylabel('Vibes')
+    plt.xlim(0, 100)
+    plt.ylim(-2.0, 2.0)
+    chart_bytes = BytesIO()
+    plt.savefig(chart_bytes, format=format)
+    plt.close()
+    return chart_bytes.getvalue()
+
+def rate(render, inputs, threads, format):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        for image in pool.map(lambda item: render(item, format), inputs):
+            assert image
+    return len(inputs) / (time.perf_counter() - start)
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    format = sys.argv[2] if len(sys.argv) > 2 else 'jpg'
+    inputs = players(count)
+    rng = np.random.default_rng(1)
+    scatters = [(rng.integers(0, 100, 300), rng.uniform(0, 10, 300)) for _ in range(count // 4)]
+    render_scatter = lambda data, format: render_fate_scatter(data[0], data[1], 'Slugging', 22, format)
+    print(f"{'pyplot vibes':>16} x1: {rate(pyplot_vibes, inputs, 1, format):7.1f} renders/s")
+    for threads in [1, 2, 4, 8]:
+        print(f"{'vibes':>16} x{threads}: {rate(render_vibes_chart, inputs, threads, format):7.1f} renders/s")
+    for threads in [1, 2, 4, 8]:
+        print(f"{'scatter':>16} x{threads}: {rate(render_scatter, scatters, threads, format):7.1f} renders/s")
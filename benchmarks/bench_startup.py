@@ -0,0 +1,71 @@
+#How long the app takes to start: importing it, then the first request to a page that doesn't draw anything and the first chart,
+#each measured in a fresh process the way a newly booted or autoscaled worker would see it. Also measures the same with warm_up() called first,
+#the way gunicorn.conf.py does it in the master before forking (there the warm-up happens once, before any worker exists).
+#Results are saved to benchmarks/results/ (see harness.py); --compare checks them against an earlier run and exits with 1 on a regression.
+#Usage: python benchmarks/bench_startup.py [--repeats 5] [--compare latest]
+import os, sys, json, time, argparse, tempfile, statistics, subprocess
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, '..'))
+from harness import save_results, latest_results, compare
+
+def child(warm):
+    #Runs in the fresh process. Prints the timings, in seconds, as JSON.
+    import contextlib
+    start = time.perf_counter()
+    import application
+    timings = {'import': time.perf_counter() - start}
+    if warm:
+        start = time.perf_counter()
+        application.warm_up()
+        timings['warm_up'] = time.perf_counter() - start
+    client = application.app.test_client()
+    player = os.environ['BENCH_PLAYER']
+    with contextlib.redirect_stdout(sys.stderr):
+        for name, path in [('first_page', '/fteam'), ('first_chart', f"/chart/vibes/{player}.png")]:
+            start = time.perf_counter()
+            response = client.get(path)
+            timings[name] = time.perf_counter() - start
+            assert response.status_code == 200, (path, response.status_code)
+    timings['numpy_loaded'] = 'numpy' in sys.modules
+    print(json.dumps(timings))
+
+def main():
+    parser = argparse.ArgumentParser(description='Time importing the app and serving its first requests in a fresh process.')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--no-save', action='store_true', help="don't save the results")
+    parser.add_argument('--compare', help="saved results to compare against, or 'latest'")
+    parser.add_argument('--threshold', type=float, default=0.1, help='fractional change that counts as a regression')
+    args = parser.parse_args()
+    baseline = latest_results('startup') if args.compare == 'latest' else args.compare
+    from fake_upstream import fake_upstream
+    server, source = fake_upstream(0.0, 50, 10)
+    scratch = tempfile.mkdtemp()
+    env = dict(os.environ, CHRONICLER_URL = server.url, REFERENCE_URL = server.url, TEAM_REFRESH_INTERVAL = '0',
+        BLASEBALL_INDEX_PATH = os.path.join(scratch, 'index.sqlite3'), LEAGUE_DATA_PATH = os.path.join(scratch, 'league_data'),
+        BENCH_PLAYER = source.players(23)[0]['player_id'], PYTHONPATH = os.path.join(here, '..'))
+    print(f"{'':>10} {'import ms':>10} {'warm-up ms':>11} {'first page ms':>14} {'first chart ms':>15}")
+    results = {}
+    for name, warm in [('cold', False), ('warmed', True)]:
+        runs = []
+        for i in range(args.repeats):
+            #A fresh response cache every time, so the first chart really does go upstream for its player.
+            env['BLASEBALL_CACHE_PATH'] = os.path.join(scratch, f"cache-{name}-{i}.sqlite3")
+            output = subprocess.run([sys.executable, __file__, '--child', str(int(warm))], env = env, check = True, capture_output = True, text = True).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+        medians = {key: statistics.median(run[key] for run in runs) * 1000 for key in ['import', 'warm_up', 'first_page', 'first_chart'] if key in runs[0]}
+        warm_up = f"{medians['warm_up']:11.0f}" if 'warm_up' in medians else f"{'-':>11}"
+        print(f"{name:>10} {medians['import']:10.0f} {warm_up} {medians['first_page']:14.0f} {medians['first_chart']:15.0f}")
+        #Stored under 'seconds' (in milliseconds, like micro.py), so compare() checks every stage for regressions.
+        for key, value in medians.items():
+            results[f"{name}_{key}"] = {'seconds': value}
+    server.stop()
+    if not args.no_save:
+        print(f"saved to {save_results('startup', {'repeats': args.repeats}, results)}")
+    if baseline and compare(results, baseline, args.threshold):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == '--child':
+        child(sys.argv[2] == '1')
+    else:
+        main()
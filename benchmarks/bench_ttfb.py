@@ -0,0 +1,60 @@
+#Time to first byte against time to the whole page for the streamed pages (/fhist and the rosters), against the local fake of both upstream APIs.
+#Every /fhist request is for a player nobody has asked about yet, so the whole history has to come from the fake, a page at a time.
+#With the page streamed, the first byte no longer waits on upstream at all, and the first Fate changes arrive while later pages are still coming.
+#Usage: python benchmarks/bench_ttfb.py [upstream latency seconds] [updates per player] [requests per route]
+import os, sys, time, tempfile, threading, statistics, logging, http.client
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, '..'))
+from fake_upstream import fake_upstream
+
+def timed_get(port, path):
+    #Returns (seconds to the first byte of the body, seconds to the first Fate change, seconds to the end of the body).
+    start = time.perf_counter()
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout = 300)
+    conn.request('GET', path)
+    response = conn.getresponse()
+    first = None
+    change = None
+    body = b''
+    while True:
+        chunk = response.read1(65536)
+        if not chunk:
+            break
+        if first == None:
+            first = time.perf_counter() - start
+        body += chunk
+        if change == None and b'their Fate changed' in body:
+            change = time.perf_counter() - start
+    conn.close()
+    return first, change, time.perf_counter() - start
+
+if __name__ == "__main__":
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else 0.05
+    updates = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    requests = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    server, source = fake_upstream(latency, 200, updates)
+    scratch = tempfile.mkdtemp()
+    os.environ.update(CHRONICLER_URL = server.url, REFERENCE_URL = server.url,
+        BLASEBALL_CACHE_PATH = os.path.join(scratch, 'cache.sqlite3'), BLASEBALL_INDEX_PATH = os.path.join(scratch, 'index.sqlite3'),
+        LEAGUE_DATA_PATH = os.path.join(scratch, 'league_data'), TEAM_REFRESH_INTERVAL = '0')
+    from werkzeug.serving import make_server
+    import application
+    application.app.logger.disabled = True
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    #A running server would already have the team list, so it's loaded before anything is timed.
+    application.directory.teams()
+    app_server = make_server('127.0.0.1', 0, application.app, threaded = True)
+    threading.Thread(target = app_server.serve_forever, daemon = True).start()
+    league = source.players(23)
+    players = iter([player['player_id'] for player in league])
+    teams = iter(sorted({player['team_id'] for player in league if player['team_id']}))
+    routes = {'fhist': lambda: f"/fhist?selected_player={next(players)}", 'froster': lambda: f"/froster?selected_team={next(teams)}"}
+    print(f"upstream latency {latency*1000:.0f} ms, {updates} updates per player, medians of {requests} requests")
+    print(f"{'route':>8} {'first byte ms':>14} {'first change ms':>16} {'whole page ms':>14}")
+    for name, pick in routes.items():
+        results = [timed_get(app_server.server_port, pick()) for i in range(requests)]
+        first, change, whole = [[result[i] for result in results if result[i] != None] for i in range(3)]
+        change = f"{statistics.median(change)*1000:16.0f}" if change else f"{'-':>16}"
+        print(f"{name:>8} {statistics.median(first)*1000:14.0f} {change} {statistics.median(whole)*1000:14.0f}")
+    app_server.shutdown()
+    server.stop()
@@ -0,0 +1,51 @@
+#Checks that a Fate-change history resumed from the fate index comes out the same as one worked out from the full history in one go.
+#Every update is tried as the resume point, including ones from before Chronicler tracked Fate and one where the API's Fate is null.
+#Exits with 1 and prints the first difference if any resume point disagrees.
+#Usage: python benchmarks/check_fate_resume.py [updates]
+import os, sys, tempfile
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, '..'))
+from fixtures import synthetic_history
+
+def summary(output):
+    return [(entry.timestamp, entry.fate, entry.fateChange, entry.name) for entry in output]
+
+if __name__ == "__main__":
+    updates = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    scratch = tempfile.mkdtemp()
+    os.environ.update(BLASEBALL_CACHE_PATH = os.path.join(scratch, 'cache.sqlite3'), BLASEBALL_INDEX_PATH = os.path.join(scratch, 'index.sqlite3'),
+        LEAGUE_DATA_PATH = os.path.join(scratch, 'league_data'), METRICS_ENABLED = '0')
+    import application
+    from fate_index import fate_index
+    id = '0f0e0d0c-0b0a-4908-8706-050403020100'
+    history = synthetic_history(id, updates, fate_changes = 8)
+    #A null Fate partway through, the way the API sometimes reports one.
+    history[updates // 2]['data']['fate'] = None
+    #The last update renames the player, since the history should always show their latest name.
+    history[-1]['data']['name'] = 'Renamed Player'
+    roster = [{'playerId': id, 'firstSeen': entry['firstSeen'], 'teamId': entry['data'].get('leagueTeamId')} for entry in history]
+    def tracker(saved = None):
+        found = application.fate_tracker.resume(saved) if saved else application.fate_tracker()
+        found.timeline = application.roster_timeline(roster)
+        return found
+    full = tracker()
+    full.feed(application.player_chronicle(entry) for entry in history)
+    expected = summary(full.output)
+    index = fate_index(os.path.join(scratch, 'resume.sqlite3'))
+    failures = 0
+    for point in range(1, updates):
+        first = tracker()
+        first.feed(application.player_chronicle(entry) for entry in history[:point])
+        first.save(index)
+        saved = application.fate_tracker.saved_state(index, id)
+        resumed = tracker(saved)
+        resumed.feed(application.player_chronicle(entry) for entry in history[point:] if entry['lastSeen'] > saved[0])
+        found = summary(resumed.output)
+        if found != expected:
+            failures += 1
+            if failures == 1:
+                print(f"resumed after update {point} differs from the full run:")
+                print(f"  full:    {expected}")
+                print(f"  resumed: {found}")
+    print(f"{updates - 1} resume points, {len(expected)} entries in the full history, {failures} differ")
+    sys.exit(1 if failures else 0)
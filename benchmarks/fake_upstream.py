@@ -0,0 +1,107 @@
+#A local fake of both upstream APIs, built on stub_server, for benchmarks and load tests.
+#Chronicler: /players/updates and /roster/updates, with a synthetic history per player.
+#Blaseball Reference: /v2/players (by season, by player pool, or a single player), /v2/teams, /v1/currentRoster and /v1/playerStats,
+#served either from synthetic fixtures or from a league_store snapshot written by ingest.py (real recorded data).
+import os, sys, threading
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, '..'))
+from stub_upstream import stub_server
+from fixtures import synthetic_teams, synthetic_league, synthetic_stats, synthetic_history, paged
+
+class synthetic_source():
+    #Reference data generated from the fixtures. Every season has the same players and teams, with the season number filled in.
+    def __init__(self, players = 600, seed = 0):
+        self.team_list = synthetic_teams(seed = seed)
+        self.league = synthetic_league(players, self.team_list, seed = seed)
+        self.stat_rows = {}
+        self.lock = threading.Lock()
+
+    def seasons(self):
+        return list(range(24))
+
+    def players(self, season):
+        return [dict(player, season = season) for player in self.league]
+
+    def teams(self, season):
+        return self.team_list
+
+    def stats(self, category, season):
+        with self.lock:
+            if (category, season) not in self.stat_rows:
+                self.stat_rows[category, season] = synthetic_stats(category, self.league, season, seed = season)
+            return self.stat_rows[category, season]
+
+class recorded_source():
+    #Reference data read from a league_store snapshot, so the fake serves what the real API returned when it was ingested.
+    def __init__(self, path):
+        from league_store import league_store
+        self.store = league_store(path)
+        self.stat_rows = {}
+        self.lock = threading.Lock()
+
+    def seasons(self):
+        return self.store.seasons()
+
+    def players(self, season):
+        return self.store.players(season).rows()
+
+    def teams(self, season):
+        return self.store.teams(season)
+
+    def stats(self, category, season):
+        with self.lock:
+            if (category, season) not in self.stat_rows:
+                self.stat_rows[category, season] = self.store.stats(category, season).rows()
+            return self.stat_rows[category, season]
+
+def reference_routes(source):
+    by_id = {}
+    by_team = {}
+    latest = max(source.seasons())
+    for player in source.players(latest):
+        by_id[player['player_id']] = player
+        by_team.setdefault(player['team_id'], []).append(player)
+    stats_by_player = {}
+    lock = threading.Lock()
+    def players(query):
+        if query.get('playerPool') == 'deceased':
+            return [player for player in by_id.values() if player.get('deceased')]
+        return source.players(int(query.get('season', latest)))
+    def player(query):
+        return by_id[query['_rest']]
+    def stats(query):
+        key = (query['category'], int(query['season']))
+        with lock:
+            if key not in stats_by_player:
+                indexed = stats_by_player[key] = {}
+                for row in source.stats(*key):
+                    indexed.setdefault(row['player_id'], []).append(row)
+        indexed = stats_by_player[key]
+        return [row for id in query['playerIds'].split(',') if id for row in indexed.get(id, [])]
+    return {'/v2/players': players, '/v2/players/': player,
+        '/v2/teams': lambda query: source.teams(int(query.get('season', latest))),
+        '/v1/currentRoster': lambda query: by_team.get(query['teamId'], []),
+        '/v1/playerStats': stats}
+
+def chronicler_routes(updates):
+    #Synthetic histories, made the first time each player is asked for. Roster updates are derived from the same history.
+    histories = {}
+    lock = threading.Lock()
+    def history(player):
+        with lock:
+            if player not in histories:
+                histories[player] = synthetic_history(player, updates)
+            return histories[player]
+    def roster(query):
+        records = [{'playerId': query['player'], 'firstSeen': record['firstSeen'], 'teamId': record['data'].get('leagueTeamId')}
+            for record in history(query['player'])]
+        return paged(records, query, key = 'firstSeen')
+    return {'/players/updates': lambda query: paged(history(query['player']), query), '/roster/updates': roster}
+
+def fake_upstream(latency = 0.05, players = 600, updates = 1000, league_data = None, seed = 0):
+    #Starts one stub server answering for both APIs and returns (server, reference source).
+    #Point CHRONICLER_URL and REFERENCE_URL at server.url to use it.
+    source = recorded_source(league_data) if league_data else synthetic_source(players, seed)
+    routes = dict(reference_routes(source))
+    routes.update(chronicler_routes(updates))
+    return stub_server(routes, latency = latency).start(), source
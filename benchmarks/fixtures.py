@@ -0,0 +1,119 @@
+#Synthetic payloads shaped like the ones Blaseball Reference and Chronicler return, for benchmarks and the stub servers.
+#Everything is generated from a seed so runs are repeatable.
+import random, uuid, datetime
+
+BATTER_STATS = ['doubles','triples','home_runs','runs_batted_in','walks','strikeouts','batting_average','on_base_percentage','batting_average_risp','slugging','on_base_slugging']
+PITCHER_STATS = ['win_pct','earned_run_average','walks_per_9','hits_per_9','strikeouts_per_9','home_runs_per_9','whip','strikeouts_per_walk']
+
+def make_id(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128)))
+
+def synthetic_teams(teams = 24, seed = 0):
+    #/v2/teams records: active teams plus a few inactive ones and the Hall Stars.
+    rng = random.Random(seed)
+    records = []
+    for i in range(teams + 4):
+        status = 'active' if i < teams else 'inactive'
+        name = f"Team {i}"
+        if i == teams:
+            name = "The Hall Stars"
+        records.append({'full_name': name, 'team_id': make_id(rng), 'team_current_status': status, 'team_emoji': '0x1F525'})
+    return records
+
+def synthetic_league(players = 500, teams = None, season = 23, seed = 0):
+    #/v2/players records for one season. About a tenth are dead and teamless, like the Hall of Flame.
+    rng = random.Random(seed)
+    teams = teams or synthetic_teams(seed = seed)
+    records = []
+    for i in range(players):
+        team = rng.choice(teams)
+        dead = rng.random() < 0.1
+        records.append({
+            'player_id': make_id(rng),
+            'player_name': f"Player {i}",
+            'team': None if dead else team['full_name'],
+            'team_id': None if dead else team['team_id'],
+            'ritual': rng.choice(['Meditation', 'Yoga', 'Tea', 'Reading']),
+            'fate': rng.randint(0, 99),
+            'cinnamon': rng.uniform(0, 1.5),
+            'buoyancy': rng.uniform(0, 1.5),
+            'pressurization': rng.uniform(0, 1.5),
+            'position_type': 'PITCHER' if rng.random() < 0.3 else 'BATTER',
+            'current_location': 'main_roster' if rng.random() < 0.7 else 'shadows',
+            'deceased': dead,
+            'season': season,
+        })
+    return records
+
+def synthetic_stats(category, league, season = 23, seed = 0, missing = 0.05, extra_teams = 0.2):
+    #/v1/playerStats rows for the players in the league. Some players get a second row for another team,
+    #some get no stats at all, and some stats are missing, to mirror what the real endpoint returns.
+    rng = random.Random(f"{seed}-{category}")
+    names = BATTER_STATS if category == 'batting' else PITCHER_STATS
+    rows = []
+    for player in league:
+        if rng.random() < 0.05:
+            continue
+        for team in range(2 if rng.random() < extra_teams else 1):
+            row = {'player_id': player['player_id'], 'team_id': f"team-{team}", 'season': season}
+            for name in names:
+                row[name] = None if rng.random() < missing else f"{rng.uniform(0, 10):.3f}"
+            rows.append(row)
+    return rows
+
+def synthetic_history(player_id, updates = 3000, seed = 0, fate_changes = 4):
+    #Chronicler /players/updates records for one player, oldest first. The early ones predate Fate and team tracking,
+    #and the Fate changes are spread through the rest, some with a team change and some with ALTERNATE added.
+    rng = random.Random(f"{seed}-{player_id}")
+    start = 1596000000
+    team = make_id(rng)
+    fate = rng.randint(0, 99)
+    mods = []
+    changes = set(rng.sample(range(updates // 4, updates), min(fate_changes, updates - updates // 4)))
+    records = []
+    for i in range(updates):
+        if i in changes:
+            fate = rng.randint(0, 99)
+            kind = rng.random()
+            if kind < 0.4:
+                team = make_id(rng)
+            elif kind < 0.7:
+                mods = mods + ['ALTERNATE']
+        data = {'id': player_id, 'name': f"Player {player_id[:8]}",
+            'buoyancy': rng.random(), 'cinnamon': rng.random(), 'pressurization': rng.random(),
+            'thwackability': rng.random(), 'moxie': rng.random(), 'divinity': rng.random(), 'musclitude': rng.random(),
+            'patheticism': rng.random(), 'martyrdom': rng.random(), 'tragicness': rng.random(), 'baseThirst': rng.random(),
+            'laserlikeness': rng.random(), 'continuation': rng.random(), 'indulgence': rng.random(), 'groundFriction': rng.random(),
+            'shakespearianism': rng.random(), 'suppression': rng.random(), 'unthwackability': rng.random(), 'coldness': rng.random(),
+            'overpowerment': rng.random(), 'ruthlessness': rng.random(), 'omniscience': rng.random(), 'tenaciousness': rng.random(),
+            'watchfulness': rng.random(), 'anticapitalism': rng.random(), 'chasiness': rng.random(),
+            'deceased': False, 'peanutAllergy': False, 'totalFingers': 10, 'soul': rng.randint(1, 10)}
+        if i >= updates // 8:
+            data['fate'] = fate
+            data['ritual'] = 'Meditation'
+            data['leagueTeamId'] = team
+            data['permAttr'] = list(mods)
+            data['seasAttr'] = []
+            data['weekAttr'] = []
+            data['gameAttr'] = []
+        stamp = start + i * 600
+        records.append({'playerId': player_id, 'hash': f"{rng.getrandbits(64):016x}",
+            'firstSeen': timestamp(stamp), 'lastSeen': timestamp(stamp + 599), 'data': data})
+    return records
+
+def timestamp(seconds):
+    return datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+def paged(records, query, count = 1000, key = 'lastSeen'):
+    #Serves a list of records the way Chronicler pages them: count per page, an opaque nextPage token,
+    #and an empty page with the same token once they run out. Honours 'after' and 'before' on the given timestamp key, and order=desc.
+    if query.get('after'):
+        records = [record for record in records if record[key] > query['after']]
+    if query.get('before'):
+        records = [record for record in records if record[key] < query['before']]
+    if query.get('order') == 'desc':
+        records = records[::-1]
+    count = int(query.get('count', count))
+    start = int(query.get('page') or 0)
+    chunk = records[start:start + count]
+    return {'nextPage': str(start + len(chunk)), 'data': chunk}
@@ -0,0 +1,73 @@
+#Shared pieces for load_test.py and micro.py: latency summaries, and saving results so later runs can be compared against them.
+#Results are written as JSON to benchmarks/results/, named after the kind of run and when it happened.
+import os, json, time, subprocess
+
+RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+def percentile(ordered, fraction):
+    #The value at the given fraction (0 to 1) of an already sorted list, interpolating between neighbours.
+    if not ordered:
+        return None
+    position = (len(ordered) - 1) * fraction
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+def summarize(latencies, elapsed, errors = 0):
+    #Latencies in seconds -> milliseconds at p50/p95/p99, plus throughput for the whole run.
+    ordered = sorted(latencies)
+    return {'requests': len(ordered), 'errors': errors, 'throughput': len(ordered) / elapsed if elapsed else 0.0,
+        'p50': percentile(ordered, 0.50) * 1000, 'p95': percentile(ordered, 0.95) * 1000, 'p99': percentile(ordered, 0.99) * 1000}
+
+def revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output = True, text = True,
+            cwd = os.path.dirname(RESULTS_PATH)).stdout.strip() or None
+    except OSError:
+        return None
+
+def save_results(kind, config, results, path = None):
+    #Writes a run's results and returns the file they went to.
+    path = path or os.path.join(RESULTS_PATH, f"{kind}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(path), exist_ok = True)
+    with open(path, 'w') as file:
+        json.dump({'kind': kind, 'revision': revision(), 'time': time.time(), 'config': config, 'results': results}, file, indent = 2)
+    return path
+
+def latest_results(kind):
+    #The most recent saved results of the given kind, or None if there aren't any.
+    if not os.path.isdir(RESULTS_PATH):
+        return None
+    found = sorted(name for name in os.listdir(RESULTS_PATH) if name.startswith(kind + '-') and name.endswith('.json'))
+    return os.path.join(RESULTS_PATH, found[-1]) if found else None
+
+#Which way is better for each metric that gets compared.
+LOWER_IS_BETTER = {'p50', 'p95', 'p99', 'seconds', 'errors', 'peak_mb'}
+HIGHER_IS_BETTER = {'throughput'}
+
+def compare(results, baseline_path, threshold = 0.1):
+    #Prints how each metric moved since the baseline run, flagging anything that got worse by more than threshold (a fraction).
+    #Returns how many metrics regressed.
+    with open(baseline_path) as file:
+        baseline = json.load(file)
+    print(f"compared with {os.path.basename(baseline_path)} (revision {baseline.get('revision')})")
+    regressions = 0
+    for name, metrics in results.items():
+        old = baseline['results'].get(name)
+        if not old:
+            continue
+        for metric, value in metrics.items():
+            before = old.get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(before, (int, float)) or metric not in LOWER_IS_BETTER | HIGHER_IS_BETTER:
+                continue
+            if before == 0:
+                change = 0.0 if value == 0 else float('inf')
+            else:
+                change = (value - before) / before
+            worse = change > threshold if metric in LOWER_IS_BETTER else change < -threshold
+            regressions += worse
+            if worse or abs(change) > threshold:
+                print(f"  {'REGRESSED' if worse else 'improved ':>9} {name} {metric}: {before:.2f} -> {value:.2f} ({change:+.0%})")
+    if not regressions:
+        print("  no regressions")
+    return regressions
@@ -0,0 +1,149 @@
+#Drives every route of the app under concurrency against the local fake of both upstream APIs, and reports p50/p95/p99 latency and throughput.
+#The app runs in this process on a threaded werkzeug server, with fresh caches and an empty league snapshot so everything goes through the fake.
+#The precomputed Fate-vs-stat analysis is built from the fake's data first, the way ingest.py would, so the analysis routes have something to serve
+#and the scatter charts read their points from it as they do in production.
+#Requests pick from a fixed pool of players, teams, stats and seasons, so the caches warm up over a run the way they would in production.
+#Results are saved to benchmarks/results/ (see harness.py); --compare checks them against an earlier run and exits with 1 on a regression.
+#Usage: python benchmarks/load_test.py [--latency 0.05] [--concurrency 1,8,32] [--requests 40] [--routes fhist,fscatter] [--compare latest]
+import os, sys, json, time, random, argparse, tempfile, threading, logging, urllib.request, urllib.error, urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, '..'))
+from fake_upstream import fake_upstream
+from fixtures import BATTER_STATS, PITCHER_STATS
+from harness import summarize, save_results, latest_results, compare
+
+def route_table(source, pool_size, seed):
+    #Every route, as a name and a function that picks a path for it.
+    rng = random.Random(seed)
+    seasons = source.seasons()
+    latest = max(seasons)
+    league = source.players(latest)
+    players = rng.sample([player['player_id'] for player in league], min(pool_size, len(league)))
+    teams = sorted({player['team_id'] for player in league if player['team_id']})
+    teams = rng.sample(teams, min(pool_size, len(teams))) + ['Underworld']
+    stats = BATTER_STATS + PITCHER_STATS
+    return {
+        'landing': lambda rng: "/",
+        'vteam': lambda rng: "/vteam",
+        'fteam': lambda rng: "/fteam",
+        'vroster': lambda rng: f"/vroster?selected_team={rng.choice(teams)}",
+        'froster': lambda rng: f"/froster?selected_team={rng.choice(teams)}",
+        'gvibes': lambda rng: f"/gvibes?selected_player={rng.choice(players)}",
+        'vibes_chart': lambda rng: f"/chart/vibes/{rng.choice(players)}.jpg",
+        'roster_vibes_chart': lambda rng: f"/chart/roster_vibes/{rng.choice(teams)}.png",
+        'api_vibes': lambda rng: f"/api/vibes?team={rng.choice(teams)}&day={rng.randrange(99)}",
+        'api_vibes_extremes': lambda rng: f"/api/vibes/extremes?day={rng.randrange(99)}&season={rng.choice(seasons)+1}",
+        'fhist': lambda rng: f"/fhist?selected_player={rng.choice(players)}",
+        'fseason': lambda rng: "/fseason",
+        'fscatter': lambda rng: f"/fscatter?selected_stat={rng.choice(stats)}&season={rng.choice(seasons)+1}",
+        'scatter_chart': lambda rng: f"/chart/scatter/{rng.choice(stats)}/{rng.choice(seasons)+1}.jpg",
+        'api_fate_stats': lambda rng: f"/api/fate_stats?stat={rng.choice(stats)}&season={rng.choice(seasons)+1}",
+        'fate_trend_chart': lambda rng: f"/chart/fate_trend/{rng.choice(stats)}.png",
+        'fchanges': lambda rng: "/fchanges" + rng.choice(['', '?cause=feedback', '?cause=alternate', '?cause=unknown']),
+        'api_fate_changes': lambda rng: f"/api/fate_changes?limit=100&offset={rng.randrange(5)*100}",
+        'cache_stats': lambda rng: "/cache/stats",
+        'metrics': lambda rng: "/metrics"}
+
+def uncovered_endpoints(app, routes):
+    #The app's endpoints that none of the routes reach, so a route added to the app can't be left out of the load test unnoticed.
+    adapter = app.url_map.bind('localhost')
+    rng = random.Random(0)
+    reached = {adapter.match(urllib.parse.urlsplit(pick(rng)).path)[0] for pick in routes.values()}
+    return sorted(rule.endpoint for rule in app.url_map.iter_rules() if rule.endpoint != 'static' and rule.endpoint not in reached)
+
+def build_analysis(source, scratch, out):
+    #/api/fate_stats and /chart/fate_trend only answer from the precomputed Fate-vs-stat analysis, which needs a snapshot to build from.
+    #The snapshot is written straight from the fake's data off to the side, so the app's own snapshot stays empty and its caches stay cold.
+    from league_store import write_table, league_store
+    from fate_tables import build_fate_tables, FILE_NAME
+    from application import batter_stats, pitcher_stats
+    root = os.path.join(scratch, 'analysis_snapshot')
+    ids = []
+    for season in source.seasons():
+        path = os.path.join(root, f"season_{season}")
+        write_table(os.path.join(path, 'players'), source.players(season), ids)
+        for category in ['batting', 'pitching']:
+            write_table(os.path.join(path, category), source.stats(category, season), ids)
+    with open(os.path.join(root, 'player_ids.json'), 'w') as file:
+        json.dump(ids, file)
+    os.makedirs(out, exist_ok=True)
+    build_fate_tables(league_store(root), {'batting': [stat[0] for stat in batter_stats], 'pitching': [stat[0] for stat in pitcher_stats]},
+        os.path.join(out, FILE_NAME))
+
+def drive(base, pick, concurrency, requests, seed):
+    #Sends requests to paths from pick, concurrency at a time. Returns (latencies in seconds, errors, elapsed seconds).
+    rngs = threading.local()
+    errors = []
+    def one(i):
+        rng = getattr(rngs, 'rng', None)
+        if rng is None:
+            rng = rngs.rng = random.Random(f"{seed}-{threading.get_ident()}")
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(base + pick(rng), timeout = 300) as response:
+                response.read()
+        except (urllib.error.URLError, OSError) as e:
+            errors.append(e)
+        return time.perf_counter() - start
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        latencies = list(pool.map(one, range(requests)))
+    return latencies, len(errors), time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test every route against a local fake of the upstream APIs.')
+    parser.add_argument('--latency', type=float, default=0.05, help='upstream latency in seconds')
+    parser.add_argument('--players', type=int, default=600, help='players in the synthetic league')
+    parser.add_argument('--updates', type=int, default=1000, help='Chronicler updates per player')
+    parser.add_argument('--league-data', help='serve Reference data from this league_store snapshot instead of synthetic fixtures')
+    parser.add_argument('--pool', type=int, default=20, help='how many players and teams requests pick from')
+    parser.add_argument('--concurrency', default='1,8,32', help='comma separated concurrency levels')
+    parser.add_argument('--requests', type=int, default=40, help='requests per route at each concurrency level')
+    parser.add_argument('--routes', help='comma separated route names to run (default all)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-save', action='store_true', help="don't save the results")
+    parser.add_argument('--compare', help="saved results to compare against, or 'latest'")
+    parser.add_argument('--threshold', type=float, default=0.1, help='fractional change that counts as a regression')
+    args = parser.parse_args()
+    baseline = latest_results('load') if args.compare == 'latest' else args.compare
+
+    server, source = fake_upstream(args.latency, args.players, args.updates, args.league_data, args.seed)
+    scratch = tempfile.mkdtemp()
+    os.environ.update(CHRONICLER_URL = server.url, REFERENCE_URL = server.url, UPSTREAM_PER_HOST_LIMIT = '64',
+        BLASEBALL_CACHE_PATH = os.path.join(scratch, 'cache.sqlite3'), BLASEBALL_INDEX_PATH = os.path.join(scratch, 'index.sqlite3'),
+        LEAGUE_DATA_PATH = os.path.join(scratch, 'league_data'), TEAM_REFRESH_INTERVAL = '0')
+    from werkzeug.serving import make_server
+    import application
+    application.app.logger.disabled = True
+    build_analysis(source, scratch, os.environ['LEAGUE_DATA_PATH'])
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    app_server = make_server('127.0.0.1', 0, application.app, threaded = True)
+    threading.Thread(target = app_server.serve_forever, daemon = True).start()
+    base = f"http://127.0.0.1:{app_server.server_port}"
+
+    routes = route_table(source, args.pool, args.seed)
+    missing = uncovered_endpoints(application.app, routes)
+    if missing:
+        sys.exit(f"route_table doesn't cover {', '.join(missing)}")
+    if args.routes:
+        routes = {name: routes[name] for name in args.routes.split(',')}
+    levels = [int(level) for level in args.concurrency.split(',')]
+    print(f"upstream latency {args.latency*1000:.0f} ms, {args.requests} requests per route per level")
+    print(f"{'route':>20} {'conc':>4} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6}")
+    results = {}
+    for name, pick in routes.items():
+        for concurrency in levels:
+            latencies, errors, elapsed = drive(base, pick, concurrency, args.requests, args.seed)
+            summary = results[f"{name}@c{concurrency}"] = summarize(latencies, elapsed, errors)
+            print(f"{name:>20} {concurrency:>4} {summary['throughput']:8.1f} {summary['p50']:8.1f} {summary['p95']:8.1f} {summary['p99']:8.1f} {errors:>6}")
+    app_server.shutdown()
+    server.stop()
+    config = {name: value for name, value in vars(args).items() if name not in ['no_save', 'compare', 'threshold']}
+    if not args.no_save:
+        print(f"saved to {save_results('load', config, results)}")
+    if baseline and compare(results, baseline, args.threshold):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#Microbenchmarks for the CPU-heavy pieces behind the slow routes: the Fate filter over a long history, the Fate/stat join,
+#and chart rendering in every format. Each is timed over several repeats, and the median and best times are reported.
+#Results are saved to benchmarks/results/ (see harness.py); --compare checks them against an earlier run and exits with 1 on a regression.
+#Usage: python benchmarks/micro.py [--repeats 15] [--updates 10000] [--players 5000] [--only fate_filter,join] [--compare latest]
+import os, sys, time, argparse, tempfile, statistics, tracemalloc
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, '..'))
+import numpy as np
+from fixtures import synthetic_history, synthetic_league, synthetic_stats, BATTER_STATS
+from harness import save_results, latest_results, compare
+from fate_analysis import fate_stat_matrix, fate_stat_summary
+
+def timed(function, repeats):
+    times = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'seconds': statistics.median(times) * 1000, 'best': min(times) * 1000, 'peak_mb': peak / 1e6}
+
+def benchmarks(application, updates, players):
+    #Every microbenchmark, as a name and a function to time.
+    history = synthetic_history('0f0e0d0c-0b0a-4908-8706-050403020100', updates, fate_changes = 20)
+    def fate_filter():
+        tracker = application.fate_tracker()
+        #An empty roster timeline, so changes that need one don't go upstream for it.
+        tracker.timeline = application.roster_timeline([])
+        tracker.feed(application.player_chronicle(entry) for entry in history)
+        return tracker.output
+    league = synthetic_league(players)
+    batting = synthetic_stats('batting', league)
+    ids = [player['player_id'] for player in league]
+    fates = [player['fate'] for player in league]
+    stat_ids = [row['player_id'] for row in batting]
+    stat_values = [float(row['slugging'] or 0.0) for row in batting]
+    stat_matrix = np.array([[np.nan if row[name] is None else float(row[name]) for name in BATTER_STATS] for row in batting])
+    join_fates, join_stats = application.pair_fate_stat(league, batting, 'slugging')
+    matrix_ids, matrix_fates, matrix_stats = fate_stat_matrix(ids, fates, stat_ids, stat_matrix)
+    roster = [application.player_record(player) for player in league[:30]]
+    matrix = application.roster_vibes(roster)
+    names = [player.name for player in roster]
+    table = {'fate_filter': fate_filter,
+        'join': lambda: application.fate_stat_join(ids, fates, stat_ids, stat_values),
+        'join_from_dicts': lambda: application.pair_fate_stat(league, batting, 'slugging'),
+        #Every batting stat joined and summarized in one pass, the way ingest.py precomputes a season.
+        'join_every_stat': lambda: fate_stat_matrix(ids, fates, stat_ids, stat_matrix),
+        'join_every_stat_separately': lambda: [application.fate_stat_join(ids, fates, stat_ids, stat_matrix[:, i]) for i in range(len(BATTER_STATS))],
+        'summarize_every_stat': lambda: fate_stat_summary(matrix_fates, matrix_stats)}
+    for format in application.FORMATS:
+        table[f'render_scatter_{format}'] = lambda format = format: application.render_fate_scatter(join_fates, join_stats, 'Slugging', 22, format)
+        table[f'render_vibes_{format}'] = lambda format = format: application.render_vibes_chart(roster[0], format)
+    table['render_roster_vibes_png'] = lambda: application.render_roster_vibes(names, matrix, 'Vibes', 'png')
+    return table
+
+def main():
+    parser = argparse.ArgumentParser(description='Microbenchmarks for the Fate filter, the Fate/stat join and chart rendering.')
+    parser.add_argument('--repeats', type=int, default=15)
+    parser.add_argument('--updates', type=int, default=10000, help='updates in the history the Fate filter runs over')
+    parser.add_argument('--players', type=int, default=5000, help='players in the league the join runs over')
+    parser.add_argument('--only', help='comma separated benchmark names to run (default all)')
+    parser.add_argument('--no-save', action='store_true', help="don't save the results")
+    parser.add_argument('--compare', help="saved results to compare against, or 'latest'")
+    parser.add_argument('--threshold', type=float, default=0.1, help='fractional change that counts as a regression')
+    args = parser.parse_args()
+    baseline = latest_results('micro') if args.compare == 'latest' else args.compare
+    scratch = tempfile.mkdtemp()
+    os.environ.update(BLASEBALL_CACHE_PATH = os.path.join(scratch, 'cache.sqlite3'), BLASEBALL_INDEX_PATH = os.path.join(scratch, 'index.sqlite3'),
+        LEAGUE_DATA_PATH = os.path.join(scratch, 'league_data'), METRICS_ENABLED = '0')
+    import application
+    table = benchmarks(application, args.updates, args.players)
+    if args.only:
+        table = {name: table[name] for name in args.only.split(',')}
+    print(f"{'benchmark':>26} {'median ms':>10} {'best ms':>10} {'peak MB':>8}")
+    results = {}
+    for name, function in table.items():
+        function()
+        result = results[name] = timed(function, args.repeats)
+        print(f"{name:>26} {result['seconds']:10.2f} {result['best']:10.2f} {result['peak_mb']:8.1f}")
+    config = {name: value for name, value in vars(args).items() if name not in ['no_save', 'compare', 'threshold']}
+    if not args.no_save:
+        print(f"saved to {save_results('micro', config, results)}")
+    if baseline and compare(results, baseline, args.threshold):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
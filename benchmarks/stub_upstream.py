@@ -0,0 +1,61 @@
+import json, threading, time, urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class stub_handler(BaseHTTPRequestHandler):
+    #Answers every GET from the server's route table, after sleeping for the configured latency.
+    #Speaks HTTP/1.1 so keep-alive clients can reuse their connection.
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        parts = urllib.parse.urlsplit(self.path)
+        query = dict(urllib.parse.parse_qsl(parts.query))
+        self.server.count(parts.path)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        route = self.server.routes.get(parts.path)
+        if route is None:
+            for prefix, handler in self.server.routes.items():
+                if prefix.endswith('/') and parts.path.startswith(prefix):
+                    route = handler
+                    query['_rest'] = parts.path[len(prefix):]
+                    break
+        if route is None:
+            body, status = b'{"error": "not found"}', 404
+        else:
+            body, status = json.dumps(route(query)).encode('utf8'), 200
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class stub_server(ThreadingHTTPServer):
+    #A local stand-in for an upstream API. routes maps a path (or a prefix ending in '/') to a function of the query dict.
+    daemon_threads = True
+
+    def __init__(self, routes, latency = 0.0, port = 0):
+        super().__init__(('127.0.0.1', port), stub_handler)
+        self.routes = routes
+        self.latency = latency
+        self.hits = {}
+        self.hits_lock = threading.Lock()
+
+    def count(self, path):
+        with self.hits_lock:
+            self.hits[path] = self.hits.get(path, 0) + 1
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
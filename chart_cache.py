@@ -0,0 +1,50 @@
+import threading, hashlib
+from collections import OrderedDict
+
+class chart_cache():
+    #In-memory cache of rendered chart images, keyed by whatever the chart is a pure function of (like a player ID, or a stat and season).
+    #The least recently used images are evicted once the stored images go over max_bytes.
+    #Each image is kept with a strong ETag computed from its bytes, so it can be revalidated without being sent again.
+    def __init__(self, max_bytes = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.images = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        #Returns (image bytes, etag) for the key, or None if it isn't cached.
+        with self.lock:
+            found = self.images.get(key)
+            if found is None:
+                self.misses += 1
+                return None
+            self.images.move_to_end(key)
+            self.hits += 1
+            return found
+
+    def put(self, key, image):
+        #Stores an image and returns (image bytes, etag).
+        entry = (image, hashlib.sha1(image).hexdigest())
+        with self.lock:
+            if key in self.images:
+                self.size -= len(self.images.pop(key)[0])
+            if len(image) <= self.max_bytes:
+                self.images[key] = entry
+                self.size += len(image)
+            while self.size > self.max_bytes:
+                old_key, (old_image, old_etag) = self.images.popitem(last=False)
+                self.size -= len(old_image)
+        return entry
+
+    def get_or_render(self, key, render):
+        #Returns the cached (image bytes, etag) for the key, rendering and storing it with render() first if needed.
+        found = self.get(key)
+        if found is None:
+            found = self.put(key, render())
+        return found
+
+    def stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.images), 'bytes': self.size}
@@ -0,0 +1,61 @@
+import json, time
+from sqlite_store import sqlite_store
+import json_codec
+
+class deceased_index(sqlite_store):
+    #Local copy of Blaseball Reference's pool of deceased players, partitioned by the team they're affiliated with.
+    #Players without a team (the Hall of Flame proper) are stored with a NULL team.
+    #update() only writes the players that changed since the last update, so keeping it current is cheap
+    #and reading a partition never has to touch the rest of the pool.
+    SCHEMA = ["""CREATE TABLE IF NOT EXISTS deceased (
+            player_id TEXT PRIMARY KEY,
+            team TEXT,
+            name TEXT NOT NULL,
+            record TEXT NOT NULL)""",
+        "CREATE INDEX IF NOT EXISTS deceased_team ON deceased (team, name)",
+        "CREATE TABLE IF NOT EXISTS deceased_meta (name TEXT PRIMARY KEY, value REAL NOT NULL)"]
+
+    def update(self, players):
+        #Brings the index in line with a freshly downloaded pool. Returns how many players were added or changed, and how many removed.
+        db = self.connect()
+        with db:
+            stored = dict(db.execute("SELECT player_id, record FROM deceased").fetchall())
+            changed = 0
+            for player in players:
+                record = json.dumps(player, sort_keys=True)
+                if stored.pop(player['player_id'], None) != record:
+                    team = player['team'] if player['team'] not in [None, 'null'] else None
+                    db.execute("INSERT OR REPLACE INTO deceased VALUES (?, ?, ?, ?)", (player['player_id'], team, player['player_name'], record))
+                    changed += 1
+            db.executemany("DELETE FROM deceased WHERE player_id = ?", [(id,) for id in stored])
+            db.execute("INSERT OR REPLACE INTO deceased_meta VALUES ('refreshed', ?)", (time.time(),))
+        return changed, len(stored)
+
+    def refreshed(self):
+        #When the index was last updated, or None if it's never been filled.
+        row = self.connect().execute("SELECT value FROM deceased_meta WHERE name = 'refreshed'").fetchone()
+        return row[0] if row else None
+
+    def attempt(self):
+        #Records that a refresh has been started, whether or not it works out.
+        db = self.connect()
+        with db:
+            db.execute("INSERT OR REPLACE INTO deceased_meta VALUES ('attempted', ?)", (time.time(),))
+
+    def attempted(self):
+        #When a refresh was last started, or None if one never has been.
+        row = self.connect().execute("SELECT value FROM deceased_meta WHERE name = 'attempted'").fetchone()
+        return row[0] if row else None
+
+    def roster(self, team = None):
+        #The records of the deceased players affiliated with a team, or with no team at all if team is None, sorted by name.
+        db = self.connect()
+        if team == None:
+            rows = db.execute("SELECT record FROM deceased WHERE team IS NULL ORDER BY name").fetchall()
+        else:
+            rows = db.execute("SELECT record FROM deceased WHERE team = ? ORDER BY name", (team,)).fetchall()
+        return [json_codec.loads(row[0]) for row in rows]
+
+    def counts(self):
+        #How many deceased players are affiliated with each team, with None for the teamless ones.
+        return dict(self.connect().execute("SELECT team, COUNT(*) FROM deceased GROUP BY team").fetchall())
@@ -0,0 +1,88 @@
+from lazy_module import lazy_module
+np = lazy_module('numpy')
+
+#Array-based helpers for comparing Fate against performance stats.
+
+def best_stat_per_player(stat_ids, stat_values):
+    #The stat list has a separate row for every team a player played for in the season. Only the highest stat is kept.
+    #Takes parallel arrays of player ids and stat values (missing stats count as 0, like they always have)
+    #and returns (ids, best values), sorted by id, with one entry per player.
+    stat_ids = np.asarray(stat_ids)
+    stat_values = np.nan_to_num(np.asarray(stat_values, dtype=np.float64), nan=0.0)
+    if len(stat_ids) == 0:
+        return stat_ids, stat_values
+    #Sort by id, then by value within each id, so the last row of each run of ids holds that player's best value.
+    order = np.lexsort((stat_values, stat_ids))
+    sorted_ids = stat_ids[order]
+    last = np.ones(len(sorted_ids), dtype=bool)
+    last[:-1] = sorted_ids[1:] != sorted_ids[:-1]
+    return sorted_ids[last], stat_values[order][last]
+
+def fate_stat_join(player_ids, fates, stat_ids, stat_values):
+    #Pairs each player's Fate with their best value of a stat, keyed on player id.
+    #Players with no stats and stats with no matching player are both dropped, so the two never get out of line.
+    #Returns (ids, fates, stats) as NumPy arrays sorted by player id, ready to plot.
+    ids, best = best_stat_per_player(stat_ids, stat_values)
+    return match_players(player_ids, fates, ids, best)
+
+def match_players(player_ids, fates, ids, best):
+    #Looks up the Fate of every id in ids (sorted, unique) and drops the ids that aren't in player_ids.
+    #best holds the stat values for ids, as a vector or with one row per id. Returns (ids, fates, best) for the matches.
+    player_ids = np.asarray(player_ids)
+    fates = np.asarray(fates, dtype=np.float64)
+    if len(ids) == 0 or len(player_ids) == 0:
+        return ids[:0], fates[:0], best[:0]
+    order = np.argsort(player_ids, kind='stable')
+    sorted_players = player_ids[order]
+    found = np.searchsorted(sorted_players, ids)
+    found[found == len(sorted_players)] = 0
+    matched = sorted_players[found] == ids
+    return ids[matched], fates[order][found[matched]], best[matched]
+
+def fate_stat_matrix(player_ids, fates, stat_ids, stat_values):
+    #fate_stat_join for several stats at once. stat_values has one column per stat and one row per entry in stat_ids.
+    #Each player's best value is picked separately for every stat, the same as joining the stats one at a time would.
+    #Returns (ids, fates, stats) with stats as a matrix of one row per player and one column per stat.
+    stat_ids = np.asarray(stat_ids)
+    stat_values = np.nan_to_num(np.asarray(stat_values, dtype=np.float64), nan=0.0)
+    if stat_values.ndim == 1:
+        stat_values = stat_values[:, None]
+    if len(stat_ids) == 0:
+        return match_players(player_ids, fates, stat_ids, stat_values)
+    order = np.argsort(stat_ids, kind='stable')
+    sorted_ids = stat_ids[order]
+    starts = np.flatnonzero(np.concatenate(([True], sorted_ids[1:] != sorted_ids[:-1])))
+    best = np.maximum.reduceat(stat_values[order], starts, axis=0)
+    return match_players(player_ids, fates, sorted_ids[starts], best)
+
+#Fate runs from 0 to 99, so the binned means use ten bins of ten.
+FATE_BINS = tuple(range(0, 101, 10))
+
+def fate_stat_summary(fates, stats, bins = FATE_BINS):
+    #Compares every column of stats against Fate in one pass: Pearson correlation, the least-squares line stat = slope * Fate + intercept,
+    #and the mean of the stat within each Fate bin. Anything that can't be computed (too few players, no spread) comes out as NaN.
+    #Returns a dict of arrays: n, r, slope and intercept have one value per stat; bin_means has a row per bin and bin_counts a value per bin.
+    fates = np.asarray(fates, dtype=np.float64)
+    stats = np.asarray(stats, dtype=np.float64)
+    if stats.ndim == 1:
+        stats = stats[:, None]
+    n = len(fates)
+    width = stats.shape[1]
+    which = np.clip(np.digitize(fates, bins) - 1, 0, len(bins) - 2)
+    bin_counts = np.bincount(which, minlength=len(bins) - 1)
+    sums = np.zeros((len(bins) - 1, width))
+    np.add.at(sums, which, stats)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        bin_means = sums / bin_counts[:, None]
+        if n < 2:
+            nan = np.full(width, np.nan)
+            return {'n': np.full(width, n), 'r': nan, 'slope': nan, 'intercept': nan.copy(), 'bin_means': bin_means, 'bin_counts': bin_counts}
+        fate_dev = fates - fates.mean()
+        stat_mean = stats.mean(axis=0)
+        stat_dev = stats - stat_mean
+        covariance = fate_dev @ stat_dev
+        fate_var = fate_dev @ fate_dev
+        stat_var = np.einsum('ij,ij->j', stat_dev, stat_dev)
+        slope = covariance / fate_var
+        r = covariance / np.sqrt(fate_var * stat_var)
+    return {'n': np.full(width, n), 'r': r, 'slope': slope, 'intercept': stat_mean - slope * fates.mean(), 'bin_means': bin_means, 'bin_counts': bin_counts}
@@ -0,0 +1,74 @@
+import time
+from sqlite_store import sqlite_store
+
+class fate_changes(sqlite_store):
+    #League-wide table of every Fate change found by fate_scan.py, one row per change, so all the Feedback swaps
+    #or Alternate rerolls can be listed without running the Fate-change detection for each player.
+    #It also keeps the scan's checkpoint: the players finished in the current run, so an interrupted scan picks up where it stopped.
+    SCHEMA = ["""CREATE TABLE IF NOT EXISTS fate_changes (
+            player_id TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            name TEXT NOT NULL,
+            team_id TEXT,
+            old_fate INTEGER,
+            new_fate INTEGER,
+            cause TEXT NOT NULL,
+            PRIMARY KEY (player_id, timestamp))""",
+        "CREATE INDEX IF NOT EXISTS fate_changes_cause ON fate_changes (cause, timestamp)",
+        """CREATE TABLE IF NOT EXISTS fate_scan_progress (
+            player_id TEXT PRIMARY KEY,
+            run REAL NOT NULL,
+            changes INTEGER NOT NULL)""",
+        "CREATE TABLE IF NOT EXISTS fate_scan_meta (name TEXT PRIMARY KEY, value REAL NOT NULL)"]
+
+    def replace(self, player_id, changes, run):
+        #Swaps in the player's full list of changes, as (timestamp, name, team_id, old_fate, new_fate, cause) tuples,
+        #and marks them done for the given run in the same transaction.
+        db = self.connect()
+        with db:
+            db.execute("DELETE FROM fate_changes WHERE player_id = ?", (player_id,))
+            db.executemany("INSERT INTO fate_changes VALUES (?, ?, ?, ?, ?, ?, ?)", [(player_id,) + tuple(change) for change in changes])
+            db.execute("INSERT OR REPLACE INTO fate_scan_progress VALUES (?, ?, ?)", (player_id, run, len(changes)))
+
+    def run(self, restart = False):
+        #The current scan run, which is just when it started. A new one is started if there isn't one yet or restart is set,
+        #which makes every player count as not yet scanned.
+        db = self.connect()
+        row = db.execute("SELECT value FROM fate_scan_meta WHERE name = 'run'").fetchone()
+        if row and not restart:
+            return row[0]
+        run = time.time()
+        with db:
+            db.execute("INSERT OR REPLACE INTO fate_scan_meta VALUES ('run', ?)", (run,))
+        return run
+
+    def finish(self, run):
+        #Records that every player in the run has been scanned.
+        db = self.connect()
+        with db:
+            db.execute("INSERT OR REPLACE INTO fate_scan_meta VALUES ('finished', ?)", (run,))
+
+    def done(self, run):
+        #The players already scanned in the run.
+        return {row[0] for row in self.connect().execute("SELECT player_id FROM fate_scan_progress WHERE run = ?", (run,))}
+
+    def finished(self):
+        #When the last complete scan started, or None if no scan has finished yet.
+        row = self.connect().execute("SELECT value FROM fate_scan_meta WHERE name = 'finished'").fetchone()
+        return row[0] if row else None
+
+    def listing(self, cause = None, limit = None, offset = 0):
+        #The changes with the given cause (every change if it's None), oldest first, as dicts.
+        query = "SELECT player_id, timestamp, name, team_id, old_fate, new_fate, cause FROM fate_changes"
+        params = []
+        if cause != None:
+            query += " WHERE cause = ?"
+            params.append(cause)
+        query += " ORDER BY timestamp, player_id LIMIT ? OFFSET ?"
+        params.extend([-1 if limit == None else limit, offset])
+        keys = ['player_id', 'timestamp', 'name', 'team_id', 'old_fate', 'new_fate', 'cause']
+        return [dict(zip(keys, row)) for row in self.connect().execute(query, params)]
+
+    def counts(self):
+        #How many changes there are with each cause.
+        return dict(self.connect().execute("SELECT cause, COUNT(*) FROM fate_changes GROUP BY cause").fetchall())
@@ -0,0 +1,34 @@
+import json, time
+from sqlite_store import sqlite_store
+import json_codec
+
+class fate_index(sqlite_store):
+    #Persisted Fate-change timelines, one row per player.
+    #Each row keeps the compacted list of Fate changes, the last stat update that had a Fate (needed to tell if the next update is a change,
+    #and null if none has had one yet) and the timestamp of the last update processed, so later requests only have to fetch what came after it.
+    SCHEMA = ["""CREATE TABLE IF NOT EXISTS fate_histories (
+            player_id TEXT PRIMARY KEY,
+            last_seen TEXT NOT NULL,
+            last_entry TEXT NOT NULL,
+            changes TEXT NOT NULL,
+            updated REAL NOT NULL)"""]
+
+    def load(self, player_id):
+        #Returns (last_seen, last_entry, changes) for the player, with the records as compact dicts, or None if they've never been indexed.
+        row = self.connect().execute("SELECT last_seen, last_entry, changes FROM fate_histories WHERE player_id = ?", (player_id,)).fetchone()
+        if row is None:
+            return None
+        return row[0], json_codec.loads(row[1]), json_codec.loads(row[2])
+
+    def save(self, player_id, last_seen, last_entry, changes):
+        #Stores the player's timeline. last_entry and changes should already be compact dicts, and last_entry can be None.
+        db = self.connect()
+        with db:
+            db.execute("INSERT OR REPLACE INTO fate_histories VALUES (?, ?, ?, ?, ?)",
+                (player_id, last_seen, json.dumps(last_entry), json.dumps(changes), time.time()))
+
+    def forget(self, player_id):
+        #Drops a player's timeline, so the next request rebuilds it from their full history.
+        db = self.connect()
+        with db:
+            db.execute("DELETE FROM fate_histories WHERE player_id = ?", (player_id,))
@@ -0,0 +1,141 @@
+#Runs the Fate-change detection over every player's Chronicler history and fills the league-wide Fate-change table (see fate_changes.py),
+#which /fchanges lists from. Downloading is done on threads, with the shared HTTP client capping how many requests are in flight to each host,
+#while building the records and classifying the changes is spread over a pool of processes.
+#Each player's timeline is also saved to the fate index, so a later scan, or /fhist, only has to fetch the updates since then.
+#Progress is checkpointed per player, so an interrupted scan picks up where it stopped; --restart starts a fresh run over every player.
+#Players are taken from the league snapshot written by ingest.py, or from the live seasonal and deceased player lists if there isn't one.
+#Usage: python fate_scan.py [--processes 4] [--fetchers 16] [--per-host 8] [--seasons 2-23] [--players id,id] [--restart] [--rebuild]
+import argparse, os, sys, time, multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+import json_codec, metrics
+from fate_changes import fate_changes
+from ingest import parse_seasons
+from application import (client, fate_store, league_data, chronicler_request, get_players_seasonal, get_pooled_players, fate_tracker,
+    player_chronicle, roster_timeline, upstream_error, CHANGE_CAUSES, NOT_TRACKED, INDEX_PATH)
+
+class timeline_needed(Exception):
+    pass
+
+class missing_timeline():
+    #Stands in for a player's roster_timeline in the worker processes, which don't go upstream.
+    #If a change can't be explained without the roster updates, asking this for them stops the classification so they can be fetched.
+    def team_before(self, timestamp):
+        raise timeline_needed()
+    def team_after(self, timestamp):
+        raise timeline_needed()
+
+def download_pages(endpoint, id, after = None):
+    #Every page of one of Chronicler's per-player endpoints, as a list of pages of entries. Paged the same way as iter_pages,
+    #but it goes straight upstream: a league-wide scan would otherwise push everything the web routes use out of the response cache.
+    pages = []
+    page = None
+    while True:
+        request = chronicler_request(endpoint, id, page, after)
+        with metrics.upstream(request):
+            body = client.get(request)
+        data = json_codec.loads(body)
+        if page == data["nextPage"] or data["nextPage"] == None:
+            return pages
+        page = data["nextPage"]
+        pages.append(data["data"])
+
+def classify(pages, saved = None, roster = None):
+    #Runs in a worker process. Feeds the pages of stat updates through a fate_tracker, resumed from the fate index if saved is given.
+    #Returns (updates fed in, the tracker's timeline as compact dicts, the timestamp of the last update, the last update with a Fate as a compact dict),
+    #or None if the roster updates are needed and weren't passed in as roster.
+    tracker = fate_tracker.resume(saved) if saved else fate_tracker()
+    tracker.timeline = roster_timeline(roster) if roster != None else missing_timeline()
+    count = 0
+    try:
+        for entries in pages:
+            count += tracker.feed([player_chronicle(entry) for entry in entries])
+    except timeline_needed:
+        return None
+    if not count:
+        return 0, None, None, None
+    return count, [entry.compact() for entry in tracker.output], tracker.newest.timestamp, tracker.last_entry.compact() if tracker.last_entry else None
+
+def change_rows(output):
+    #Turns a compacted timeline into rows for the Fate-change table. Every row gets the player's latest name, which the timeline starts with.
+    rows = []
+    for before, entry in zip(output, output[1:]):
+        if entry["fateChange"]:
+            team = None if entry["teamID"] == NOT_TRACKED else entry["teamID"]
+            rows.append((entry["timestamp"], output[0]["name"], team, before["fate"], entry["fate"], CHANGE_CAUSES.get(entry["fateChange"], 'unknown')))
+    return rows
+
+def scan_player(id, processes, table, run, rebuild):
+    #Downloads what's new for one player, classifies it in the process pool and stores the result. Returns how many changes they have.
+    saved = None if rebuild else fate_tracker.saved_state(fate_store, id)
+    pages = download_pages('/players/updates', id, after = saved[0] if saved else None)
+    result = processes.submit(classify, pages, saved).result()
+    if result == None:
+        roster = [entry for entries in download_pages('/roster/updates', id) for entry in entries]
+        result = processes.submit(classify, pages, saved, roster).result()
+    count, output, last_seen, last_entry = result
+    if count:
+        fate_store.save(id, last_seen, last_entry, output)
+    else:
+        #Nothing new since they were indexed (their changes still go in the table, since it may not have them yet), or Chronicler has nothing for them.
+        output = saved[2] if saved else []
+    rows = change_rows(output)
+    table.replace(id, rows, run)
+    return len(rows)
+
+def league_player_ids(seasons):
+    #Every player to scan: everyone in the league snapshot, or everyone in the given seasons and the deceased pool if there's no snapshot.
+    if league_data.seasons():
+        return list(league_data.player_ids())
+    ids = {}
+    for season in seasons:
+        for player in get_players_seasonal(season):
+            ids[player['player_id']] = True
+    for player in get_pooled_players():
+        ids[player['player_id']] = True
+    return list(ids)
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan every player's Chronicler history for Fate changes.")
+    parser.add_argument('--processes', type=int, default=os.cpu_count(), help='worker processes for classifying')
+    parser.add_argument('--fetchers', type=int, default=16, help='players downloaded at once')
+    parser.add_argument('--per-host', type=int, default=client.per_host_limit, help='requests in flight to each upstream host at once')
+    parser.add_argument('--seasons', default='2-23', help="seasons to take players from if there's no league snapshot")
+    parser.add_argument('--players', help='comma separated player ids to scan instead of the whole league')
+    parser.add_argument('--restart', action='store_true', help='start a new run instead of resuming the last one')
+    parser.add_argument('--rebuild', action='store_true', help="classify every player's full history again instead of only their new updates")
+    args = parser.parse_args()
+    #Host pools are made on first use, so this applies to every request the scan makes.
+    client.per_host_limit = args.per_host
+    table = fate_changes(INDEX_PATH)
+    run = table.run(restart = args.restart or args.rebuild)
+    ids = args.players.split(',') if args.players else league_player_ids(parse_seasons(args.seasons))
+    done = table.done(run)
+    todo = [id for id in ids if id not in done]
+    print(f"{len(ids)} players, {len(ids) - len(todo)} already scanned in this run, {len(todo)} to go")
+    start = time.perf_counter()
+    failed = 0
+    changes = 0
+    #Workers are started by a fork server rather than forked from here: the pool starts them on its first submit(), from a fetcher thread,
+    #and a fork at that point could copy a lock (a metrics histogram's, or the HTTP client's) that another fetcher is holding.
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    with ProcessPoolExecutor(args.processes, mp_context = multiprocessing.get_context(method)) as processes, \
+            ThreadPoolExecutor(args.fetchers, thread_name_prefix = 'scan') as fetchers:
+        pending = {fetchers.submit(scan_player, id, processes, table, run, args.rebuild): id for id in todo}
+        for i, future in enumerate(as_completed(pending), 1):
+            try:
+                changes += future.result()
+            except upstream_error as e:
+                #Left unmarked, so the next run tries them again.
+                failed += 1
+                print(f"Couldn't scan {pending[future]}: {e}", file = sys.stderr)
+            if i % 100 == 0 or i == len(pending):
+                elapsed = time.perf_counter() - start
+                print(f"{i}/{len(pending)} players, {changes} changes found, {i / elapsed:.1f} players/s")
+    if failed:
+        print(f"{failed} players failed; run again to retry them.")
+        sys.exit(1)
+    table.finish(run)
+    print(f"Done. Changes by cause: {table.counts()}")
+
+if __name__ == "__main__":
+    main()
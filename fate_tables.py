@@ -0,0 +1,134 @@
+import os, math, threading
+from lazy_module import lazy_module
+np = lazy_module('numpy')
+from fate_analysis import fate_stat_matrix, fate_stat_summary, FATE_BINS
+
+#Precomputed Fate-vs-stat analysis for every season and stat in a league snapshot, written by ingest.py next to the snapshot.
+#For every (season, stat) cell it keeps the number of players, the correlation with Fate, the least-squares fit and the binned means,
+#along with the joined (Fate, stat) points themselves so the scatter charts can be drawn without redoing the join.
+#Everything is stored in one .npz file:
+#   seasons, stats, categories, bins          the axes: API season numbers, stat names and their category, Fate bin edges
+#   n, r, slope, intercept                    one row per season, one column per stat
+#   bin_means, bin_counts                     one row per season, then one row per Fate bin, then one column per stat
+#   fates_<season>_<category>                 the Fate of every player joined for that season and category
+#   values_<season>_<category>                their stats, one column per stat in the category (in the order of stats)
+
+FILE_NAME = 'fate_stats.npz'
+
+def build_fate_tables(store, categories, path = None):
+    #Computes the tables for every season in the league_store. categories maps 'batting'/'pitching' to the stat names to include.
+    #Returns the path written to. The file is replaced in one go, so readers never see half of it.
+    path = path or os.path.join(store.root, FILE_NAME)
+    seasons = store.seasons()
+    stats = [name for names in categories.values() for name in names]
+    shape = (len(seasons), len(stats))
+    tables = {'n': np.zeros(shape, dtype=np.int64), 'r': np.full(shape, np.nan), 'slope': np.full(shape, np.nan), 'intercept': np.full(shape, np.nan),
+        'bin_means': np.full((len(seasons), len(FATE_BINS) - 1, len(stats)), np.nan), 'bin_counts': np.zeros((len(seasons), len(FATE_BINS) - 1, len(stats)), dtype=np.int64)}
+    points = {}
+    for row, season in enumerate(seasons):
+        players = store.players(season)
+        column = 0
+        for category, names in categories.items():
+            position = 'BATTER' if category == 'batting' else 'PITCHER'
+            keep = players.equals('position_type', position) & players.equals('current_location', 'main_roster')
+            table = store.stats(category, season)
+            if 'player_id' in table:
+                stat_ids = table.column('player_id')
+                values = np.column_stack([table.numbers(name) for name in names])
+            else:
+                stat_ids = np.zeros(0, dtype=np.int32)
+                values = np.zeros((0, len(names)))
+            ids, fates, matrix = fate_stat_matrix(players.column('player_id')[keep], players.numbers('fate')[keep], stat_ids, values)
+            summary = fate_stat_summary(fates, matrix)
+            span = slice(column, column + len(names))
+            for key in ['n', 'r', 'slope', 'intercept']:
+                tables[key][row, span] = summary[key]
+            tables['bin_means'][row, :, span] = summary['bin_means']
+            tables['bin_counts'][row, :, span] = summary['bin_counts'][:, None]
+            points[f"fates_{season}_{category}"] = fates
+            points[f"values_{season}_{category}"] = matrix
+            column += len(names)
+    partial = path + '.partial'
+    with open(partial, 'wb') as file:
+        np.savez(file, seasons=np.array(seasons, dtype=np.int64), stats=np.array(stats), bins=np.array(FATE_BINS),
+            categories=np.array([category for category, names in categories.items() for name in names]), **tables, **points)
+    os.replace(partial, path)
+    return path
+
+def number(value):
+    #A NumPy number as a plain one for JSON, with NaN as None.
+    value = value.item()
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+class fate_tables():
+    #Read access to the file written by build_fate_tables. It's loaded the first time it's needed, and again whenever it's been rewritten.
+    def __init__(self, root):
+        self.path = os.path.join(root, FILE_NAME)
+        self.lock = threading.Lock()
+        self.state = None
+
+    def load(self):
+        #Returns (version, arrays, stat index, season index), or None if there's no file.
+        try:
+            version = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        state = self.state
+        if state is None or state[0] != version:
+            with self.lock:
+                state = self.state
+                if state is None or state[0] != version:
+                    with np.load(self.path) as file:
+                        arrays = {key: file[key] for key in file.files}
+                    state = self.state = (version, arrays, {name: i for i, name in enumerate(arrays['stats'].tolist())},
+                        {season: i for i, season in enumerate(arrays['seasons'].tolist())})
+        return state
+
+    def version(self):
+        #Changes every time the tables are rebuilt, for keying anything drawn from them. None if there are no tables.
+        state = self.load()
+        return state[0] if state else None
+
+    def locate(self, statistic, season = None):
+        #Returns (arrays, stat column, season row) for a cell, or None if the tables don't cover it. season can be None to skip it.
+        state = self.load()
+        if state is None:
+            return None
+        version, arrays, stat_index, season_index = state
+        if statistic not in stat_index or (season is not None and season not in season_index):
+            return None
+        return arrays, stat_index[statistic], season_index.get(season)
+
+    def points(self, statistic, season):
+        #The joined (Fates, stat values) for one stat and season as NumPy arrays, or None if the tables don't cover it.
+        found = self.locate(statistic, season)
+        if found is None:
+            return None
+        arrays, column, row = found
+        category = arrays['categories'][column]
+        #The values are stored one column per stat in the category, so count how far into the category this stat is.
+        offset = column - int(np.flatnonzero(arrays['categories'] == category)[0])
+        return arrays[f"fates_{season}_{category}"], arrays[f"values_{season}_{category}"][:, offset]
+
+    def cell(self, statistic, season):
+        #Everything computed for one stat and season, ready to send as JSON, or None if the tables don't cover it.
+        found = self.locate(statistic, season)
+        if found is None:
+            return None
+        arrays, column, row = found
+        bins = arrays['bins'].tolist()
+        return {'stat': statistic, 'season': season + 1, 'players': number(arrays['n'][row, column]),
+            'r': number(arrays['r'][row, column]), 'slope': number(arrays['slope'][row, column]), 'intercept': number(arrays['intercept'][row, column]),
+            'bins': [{'fate': [bins[i], bins[i+1] - 1], 'players': number(arrays['bin_counts'][row, i, column]), 'mean': number(arrays['bin_means'][row, i, column])}
+                for i in range(len(bins) - 1)]}
+
+    def trend(self, statistic):
+        #The stat's correlation and fit in every season, ready to send as JSON, or None if the tables don't have the stat.
+        #Seasons are numbered the way the site shows them.
+        found = self.locate(statistic)
+        if found is None:
+            return None
+        arrays, column, row = found
+        return {'stat': statistic, 'seasons': [season + 1 for season in arrays['seasons'].tolist()],
+            'players': [number(value) for value in arrays['n'][:, column]], 'r': [number(value) for value in arrays['r'][:, column]],
+            'slope': [number(value) for value in arrays['slope'][:, column]], 'intercept': [number(value) for value in arrays['intercept'][:, column]]}
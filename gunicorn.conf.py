@@ -0,0 +1,16 @@
+#Settings for serving the app with gunicorn:
+#   gunicorn -c gunicorn.conf.py application:app
+#The app is imported once in the master and then forked, and numpy and matplotlib are warmed up before the fork,
+#so workers boot straight away with the charting stack already loaded. Set WARM_UP=0 to skip that and let each worker load it on first use.
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:8080')
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('THREADS', 8))
+preload_app = True
+
+def on_starting(server):
+    if os.environ.get('WARM_UP', '1') != '0':
+        import application
+        application.warm_up()
+        server.log.info("Warmed up numpy and matplotlib")
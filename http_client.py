@@ -0,0 +1,144 @@
+import http.client, threading, time, random, gzip, urllib.parse
+
+class upstream_error(Exception):
+    #Something went wrong talking to Blaseball Reference or Chronicler.
+    #Raised instead of printing the problem and handing None back to the caller.
+    def __init__(self, url, message):
+        super().__init__(f"{message} ({url})")
+        self.url = url
+
+class upstream_unavailable(upstream_error):
+    #The server couldn't be reached at all (refused, reset, timed out), even after retrying.
+    pass
+
+class upstream_status_error(upstream_error):
+    #The server answered, but with an error status.
+    def __init__(self, url, status, reason = ''):
+        super().__init__(url, f"HTTP {status} {reason}".strip())
+        self.status = status
+
+class host_pool():
+    #Idle keep-alive connections to a single host, plus the semaphore that caps how many requests can be in flight to it.
+    def __init__(self, scheme, host, port, limit):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.idle = []
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(limit)
+
+    def take(self, connect_timeout):
+        #Returns an idle connection if there is one, otherwise a fresh one. The bool says if it was reused.
+        with self.lock:
+            if self.idle:
+                return self.idle.pop(), True
+        if self.scheme == 'https':
+            conn = http.client.HTTPSConnection(self.host, self.port, timeout = connect_timeout)
+        else:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout = connect_timeout)
+        return conn, False
+
+    def give_back(self, conn):
+        with self.lock:
+            self.idle.append(conn)
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for conn in idle:
+            conn.close()
+
+class http_client():
+    #A small keep-alive HTTP client shared by every fetcher.
+    #Connections are pooled per host so repeat calls skip the TLS handshake, every request has connect and read timeouts,
+    #failed requests are retried with bounded exponential backoff, and each host has a cap on concurrent requests.
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, connect_timeout = 5.0, read_timeout = 30.0, retries = 3, backoff = 0.25, max_backoff = 4.0, per_host_limit = 8):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.per_host_limit = per_host_limit
+        self.pools = {}
+        self.lock = threading.Lock()
+
+    def pool_for(self, parts):
+        scheme = parts.scheme or 'https'
+        port = parts.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parts.hostname, port)
+        with self.lock:
+            if key not in self.pools:
+                self.pools[key] = host_pool(scheme, parts.hostname, port, self.per_host_limit)
+            return self.pools[key]
+
+    def get(self, url, redirects = 3):
+        #Fetches the URL and returns the response body as bytes.
+        #Raises upstream_status_error for error statuses and upstream_unavailable if the host can't be reached.
+        parts = urllib.parse.urlsplit(url)
+        pool = self.pool_for(parts)
+        path = parts.path or '/'
+        if parts.query:
+            path = path + '?' + parts.query
+        attempt = 0
+        while True:
+            with pool.slots:
+                try:
+                    status, reason, location, body = self.attempt(pool, path)
+                except (OSError, http.client.HTTPException) as e:
+                    status, error = None, upstream_unavailable(url, f"{type(e).__name__}: {e}")
+            if status is not None:
+                #The slot is released before following a redirect, so a redirect to the same host can't deadlock on it.
+                if 300 <= status < 400 and location and redirects > 0:
+                    return self.get(urllib.parse.urljoin(url, location), redirects - 1)
+                if status < 300:
+                    return body
+                error = upstream_status_error(url, status, reason)
+                if status not in self.RETRY_STATUSES:
+                    raise error
+            attempt += 1
+            if attempt > self.retries:
+                raise error
+            #Full jitter keeps a burst of failed requests from all retrying in lockstep.
+            delay = min(self.max_backoff, self.backoff * (2 ** (attempt - 1)))
+            time.sleep(random.uniform(0, delay))
+
+    def attempt(self, pool, path):
+        #Makes one request on a pooled connection. A reused connection that turns out to have been closed by the server
+        #is retried once on a fresh connection right away, since that isn't a real failure.
+        conn, reused = pool.take(self.connect_timeout)
+        try:
+            return self.send(pool, conn, path)
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            if not reused:
+                raise
+        conn, reused = pool.take(self.connect_timeout)
+        try:
+            return self.send(pool, conn, path)
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            raise
+
+    def send(self, pool, conn, path):
+        if conn.sock is None:
+            conn.connect()
+        conn.sock.settimeout(self.read_timeout)
+        conn.request('GET', path, headers = {'Accept': 'application/json', 'Accept-Encoding': 'gzip'})
+        response = conn.getresponse()
+        body = response.read()
+        if response.getheader('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        if response.will_close:
+            conn.close()
+        else:
+            pool.give_back(conn)
+        return response.status, response.reason, response.getheader('Location'), body
+
+    def close(self):
+        #Closes every idle pooled connection.
+        with self.lock:
+            pools = list(self.pools.values())
+        for pool in pools:
+            pool.close()
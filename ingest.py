@@ -0,0 +1,90 @@
+#Snapshots every season of Blaseball Reference into a local columnar store (see league_store.py),
+#so the web routes can read players, teams and stats without going upstream.
+#It also fills the Hall of Flame index with the current deceased pool, unless --skip-deceased is given,
+#and then precomputes the Fate-vs-stat analysis for every season in the store (see fate_tables.py), unless --skip-analysis is given.
+#--analysis-only just redoes the analysis from what's already been ingested, without going upstream.
+#Usage: python ingest.py [--out league_data] [--seasons 2-23] [--skip-deceased] [--skip-analysis] [--analysis-only]
+#Seasons are numbered the way the API numbers them, which is one less than the season shown on the site.
+import argparse, json, os, shutil
+from league_store import write_table, league_store
+from fate_tables import build_fate_tables
+from application import get_players_seasonal, get_teams, get_player_stats, refresh_hall_of_flame, LEAGUE_DATA_PATH, STATS_BATCH, batter_stats, pitcher_stats
+
+def parse_seasons(text):
+    #Turns '2-23' or '5' or '3,7,9' into a list of season numbers.
+    seasons = []
+    for part in text.split(','):
+        if '-' in part:
+            start, end = part.split('-')
+            seasons.extend(range(int(start), int(end)+1))
+        else:
+            seasons.append(int(part))
+    return seasons
+
+def ingest_season(root, season, ids, ids_path):
+    #Writes the season to a directory of its own, then swaps it in whole, so readers only ever see a complete season.
+    path = os.path.join(root, f"partial_season_{season}")
+    shutil.rmtree(path, ignore_errors=True)
+    league = get_players_seasonal(season)
+    teams = get_teams(season)
+    write_table(os.path.join(path, 'players'), league, ids)
+    with open(os.path.join(path, 'teams.json'), 'w') as file:
+        json.dump(teams, file)
+    for category, position in [('batting', 'BATTER'), ('pitching', 'PITCHER')]:
+        players = [player for player in league if player['position_type'] == position]
+        stats = []
+        for i in range(0, len(players), STATS_BATCH):
+            stats.extend(get_player_stats(category, season, players[i:i+STATS_BATCH]) or [])
+        write_table(os.path.join(path, category), stats, ids)
+        print(f"Season {season}: {len(stats)} {category} rows")
+    #The ids the new tables point at have to be there before the tables are.
+    save_ids(ids_path, ids)
+    final = os.path.join(root, f"season_{season}")
+    old = os.path.join(root, f"old_season_{season}")
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(final):
+        #A directory can't be replaced while it has anything in it, so the old season is moved out of the way first.
+        #Tables that are already open keep reading the old files.
+        os.replace(final, old)
+    os.replace(path, final)
+    shutil.rmtree(old, ignore_errors=True)
+    print(f"Season {season}: {len(league)} players, {len(teams)} teams")
+
+def save_ids(ids_path, ids):
+    partial = ids_path + '.partial'
+    with open(partial, 'w') as file:
+        json.dump(ids, file)
+    os.replace(partial, ids_path)
+
+def main():
+    parser = argparse.ArgumentParser(description='Snapshot Blaseball Reference into a local columnar store.')
+    parser.add_argument('--out', default=LEAGUE_DATA_PATH, help='directory to write the store to')
+    parser.add_argument('--seasons', default='2-23', help="seasons to ingest, like '2-23' or '5,6'")
+    parser.add_argument('--skip-deceased', action='store_true', help="don't update the Hall of Flame index")
+    parser.add_argument('--skip-analysis', action='store_true', help="don't precompute the Fate-vs-stat analysis")
+    parser.add_argument('--analysis-only', action='store_true', help="only precompute the Fate-vs-stat analysis from the existing store")
+    args = parser.parse_args()
+    if args.analysis_only:
+        analyze(args.out)
+        return
+    ids_path = os.path.join(args.out, 'player_ids.json')
+    ids = []
+    if os.path.exists(ids_path):
+        with open(ids_path) as file:
+            ids = json.load(file)
+    os.makedirs(args.out, exist_ok=True)
+    for season in parse_seasons(args.seasons):
+        #Each season is swapped in once it's complete, so an interrupted run still leaves a readable store.
+        ingest_season(args.out, season, ids, ids_path)
+    if not args.skip_deceased:
+        refresh_hall_of_flame()
+        print("Hall of Flame index updated")
+    if not args.skip_analysis:
+        analyze(args.out)
+
+def analyze(root):
+    path = build_fate_tables(league_store(root), {'batting': [stat[0] for stat in batter_stats], 'pitching': [stat[0] for stat in pitcher_stats]})
+    print(f"Fate-vs-stat analysis written to {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import json, os, logging
+
+#The JSON decoder used for upstream responses and the app's own stored JSON.
+#Chronicler pages and Blaseball Reference's season-wide player lists run to megabytes, so decoding them is a real share of the CPU
+#behind /fhist and /fscatter. This uses the fastest decoder that's installed: msgspec, then orjson, then the standard library's json.
+#All of them take bytes or str and give back the same plain dicts and lists, so callers don't need to know which one is in use.
+#Set JSON_BACKEND to one of the names in BACKENDS to pick one explicitly.
+
+BACKENDS = {}
+try:
+    import msgspec
+    BACKENDS['msgspec'] = msgspec.json.Decoder().decode
+except ImportError:
+    pass
+try:
+    import orjson
+    BACKENDS['orjson'] = orjson.loads
+except ImportError:
+    pass
+BACKENDS['json'] = json.loads
+
+def pick_backend(name = None):
+    #The named backend if it's installed, otherwise the fastest one that is.
+    if name in BACKENDS:
+        return name
+    if name:
+        logging.getLogger(__name__).warning(f"JSON backend {name} isn't installed, using {next(iter(BACKENDS))} instead")
+    return next(iter(BACKENDS))
+
+BACKEND = pick_backend(os.environ.get('JSON_BACKEND'))
+loads = BACKENDS[BACKEND]
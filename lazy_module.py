@@ -0,0 +1,29 @@
+import importlib, threading
+
+class lazy_module():
+    #Stands in for a module that's only imported the first time one of its attributes is used, so importing the app doesn't pay for it.
+    #np = lazy_module('numpy') works anywhere import numpy as np would, as long as nothing touches np while the importing module is loading.
+    #setup, if given, is called with the module right after it's imported.
+    #Everything on the stand-in itself starts with lazy_, so it can't hide anything the real module has (numpy has its own load, for one).
+    def __init__(self, name, setup = None):
+        self.lazy_name = name
+        self.lazy_setup = setup
+        self.lazy_module = None
+        self.lazy_lock = threading.Lock()
+
+    def lazy_load(self):
+        #Imports the module if it hasn't been yet, and returns it.
+        module = self.lazy_module
+        if module is None:
+            with self.lazy_lock:
+                module = self.lazy_module
+                if module is None:
+                    module = importlib.import_module(self.lazy_name)
+                    if self.lazy_setup:
+                        self.lazy_setup(module)
+                    self.lazy_module = module
+        return module
+
+    def __getattr__(self, key):
+        #Only called for attributes the stand-in doesn't have itself, which is everything the real module has.
+        return getattr(self.lazy_load(), key)
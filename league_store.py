@@ -0,0 +1,177 @@
+import os, json, math, re
+from lazy_module import lazy_module
+np = lazy_module('numpy')
+
+#Local columnar snapshot of Blaseball Reference, written by ingest.py and read by the web routes with no network.
+#Layout:
+#   root/player_ids.json                     every player id seen, in the order they were first ingested
+#   root/season_<n>/players/                 one table per season of /v2/players
+#   root/season_<n>/batting/, pitching/      one table per season and category of /v1/playerStats
+#   root/season_<n>/teams.json               /v2/teams for the season, as returned
+#A table is a directory with one .npy file per column and a columns.json describing them.
+#Numeric columns (including numbers Blaseball Reference sends as strings) are stored as numbers (NaN for missing values), text columns as int32 codes into a per-column list of strings,
+#and player_id is stored as an index into player_ids.json so tables from different seasons line up.
+
+NUMBER = re.compile(r'-?\d+(\.\d*)?([eE][-+]?\d+)?')
+
+def is_number(value):
+    #Blaseball Reference sends a lot of its stats as strings like "0.312", so those count as numbers too.
+    if isinstance(value, str):
+        return NUMBER.fullmatch(value) is not None
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def write_table(path, rows, ids):
+    #Writes a list of dicts as a columnar table. ids is the shared player id dictionary, extended in place with any new ids.
+    #Nested values (lists and dicts) aren't stored.
+    os.makedirs(path, exist_ok=True)
+    id_index = {id: i for i, id in enumerate(ids)}
+    keys = []
+    for row in rows:
+        for key in row:
+            if key not in keys:
+                keys.append(key)
+    columns = {}
+    for key in keys:
+        values = [row.get(key) for row in rows]
+        present = [value for value in values if value is not None]
+        if any(isinstance(value, (list, dict)) for value in present):
+            continue
+        if key == 'player_id':
+            for value in values:
+                if value not in id_index:
+                    id_index[value] = len(ids)
+                    ids.append(value)
+            array = np.array([id_index[value] for value in values], dtype=np.int32)
+            columns[key] = {'kind': 'player_id'}
+        elif present and all(is_number(value) for value in present):
+            if len(present) == len(values) and all(isinstance(value, int) for value in present):
+                array = np.array(values, dtype=np.int64)
+            else:
+                array = np.array([math.nan if value is None else float(value) for value in values], dtype=np.float64)
+            columns[key] = {'kind': 'number'}
+        else:
+            strings = []
+            codes = {}
+            array = np.empty(len(values), dtype=np.int32)
+            for i, value in enumerate(values):
+                if value is None:
+                    array[i] = -1
+                    continue
+                value = str(value)
+                if value not in codes:
+                    codes[value] = len(strings)
+                    strings.append(value)
+                array[i] = codes[value]
+            columns[key] = {'kind': 'text', 'strings': strings}
+        np.save(os.path.join(path, key + '.npy'), array)
+    with open(os.path.join(path, 'columns.json'), 'w') as file:
+        json.dump({'rows': len(rows), 'columns': columns}, file)
+
+class league_table():
+    #A columnar table written by write_table. Every column is memory-mapped when it's opened, which is cheap since nothing's read
+    #until it's used, and means the table keeps reading the files it was opened with even if ingest.py swaps in a new season.
+    def __init__(self, path, ids):
+        self.path = path
+        self.ids = ids
+        with open(os.path.join(path, 'columns.json')) as file:
+            meta = json.load(file)
+        self.length = meta['rows']
+        self.meta = meta['columns']
+        self.arrays = {key: np.load(os.path.join(path, key + '.npy'), mmap_mode='r') for key in self.meta}
+
+    def __len__(self):
+        return self.length
+
+    def __contains__(self, key):
+        return key in self.meta
+
+    def column(self, key):
+        #The raw column: numbers for numeric columns, codes for text and player_id columns.
+        return self.arrays[key]
+
+    def strings(self, key):
+        #The list of strings a text column's codes point into.
+        return self.meta[key]['strings']
+
+    def numbers(self, key):
+        #A numeric column as floats. Columns that are missing or aren't numeric come back as all NaN.
+        if key not in self.meta or self.meta[key]['kind'] != 'number':
+            return np.full(self.length, np.nan)
+        return np.asarray(self.column(key), dtype=np.float64)
+
+    def equals(self, key, value):
+        #Boolean mask of the rows where a text column holds the given value.
+        if key not in self.meta or value not in self.strings(key):
+            return np.zeros(self.length, dtype=bool)
+        return np.asarray(self.column(key)) == self.strings(key).index(value)
+
+    def decoded(self, key):
+        #The column as plain Python values, with text and ids turned back into strings and missing values as None.
+        kind = self.meta[key]['kind']
+        column = self.column(key)
+        if kind == 'player_id':
+            return [self.ids[code] for code in column.tolist()]
+        if kind == 'text':
+            strings = self.strings(key)
+            return [strings[code] if code >= 0 else None for code in column.tolist()]
+        return [None if value != value else value for value in column.tolist()]
+
+    def rows(self):
+        #The table as a list of dicts, shaped like the records Blaseball Reference returns.
+        columns = {key: self.decoded(key) for key in self.meta}
+        return [{key: columns[key][i] for key in columns} for i in range(self.length)]
+
+class league_store():
+    #Read access to a snapshot written by ingest.py.
+    #ingest.py swaps in a whole season directory at a time, so the player ids and tables are read again whenever their files change.
+    def __init__(self, root):
+        self.root = root
+        self.ids = None
+        self.tables = {}
+
+    def season_path(self, season):
+        return os.path.join(self.root, f"season_{season}")
+
+    def has_season(self, season):
+        return os.path.exists(os.path.join(self.season_path(season), 'players', 'columns.json'))
+
+    def seasons(self):
+        #Every season that's been ingested, in order.
+        if not os.path.isdir(self.root):
+            return []
+        found = []
+        for name in os.listdir(self.root):
+            if name.startswith('season_') and self.has_season(int(name[7:])):
+                found.append(int(name[7:]))
+        return sorted(found)
+
+    def player_ids(self):
+        path = os.path.join(self.root, 'player_ids.json')
+        version = os.stat(path).st_mtime_ns
+        found = self.ids
+        if found is None or found[0] != version:
+            with open(path) as file:
+                found = self.ids = (version, json.load(file))
+        return found[1]
+
+    def table(self, season, name):
+        #Cached as (version, table), where the version is when its columns.json was written.
+        path = os.path.join(self.season_path(season), name)
+        version = os.stat(os.path.join(path, 'columns.json')).st_mtime_ns
+        found = self.tables.get((season, name))
+        if found is None or found[0] != version:
+            found = self.tables[(season, name)] = (version, league_table(path, self.player_ids()))
+        return found[1]
+
+    def players(self, season):
+        #The season's /v2/players table.
+        return self.table(season, 'players')
+
+    def stats(self, category, season):
+        #The season's /v1/playerStats table for 'batting' or 'pitching'.
+        return self.table(season, category)
+
+    def teams(self, season):
+        #The season's /v2/teams records, as returned.
+        with open(os.path.join(self.season_path(season), 'teams.json')) as file:
+            return json.load(file)
@@ -0,0 +1,155 @@
+import os, time, bisect, threading, contextlib, contextvars, urllib.parse
+
+#Timing for the app, exposed in Prometheus' text format by the /metrics route.
+#Code marks the stages worth timing with span('name'), and every finished span goes into a latency histogram for that stage.
+#Upstream calls go through upstream(url) instead, which keeps a histogram per host and counts failures by host and error type.
+#If METRICS_ENABLED is 0, span() and upstream() hand back a shared do-nothing context manager, so leaving them in costs next to nothing.
+#With SERVER_TIMING set to 1, each response also gets a Server-Timing header adding up the spans that ran for that request.
+
+ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+SERVER_TIMING = ENABLED and os.environ.get('SERVER_TIMING', '0') == '1'
+
+#Bucket upper bounds, in seconds.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class histogram():
+    #Latency histogram with fixed buckets, one series per label value.
+    def __init__(self, name, help, label):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, seconds):
+        with self.lock:
+            found = self.series.get(value)
+            if found is None:
+                found = self.series[value] = [[0] * (len(BUCKETS) + 1), 0.0, 0]
+            found[0][bisect.bisect_left(BUCKETS, seconds)] += 1
+            found[1] += seconds
+            found[2] += 1
+
+    def exposition(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            series = {value: (list(counts), total, count) for value, (counts, total, count) in self.series.items()}
+        for value, (counts, total, count) in sorted(series.items()):
+            label = f'{self.label}="{escape(value)}"'
+            running = 0
+            for bound, bucket in zip(BUCKETS + ('+Inf',), counts):
+                running += bucket
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {running}')
+            lines.append(f"{self.name}_sum{{{label}}} {total}")
+            lines.append(f"{self.name}_count{{{label}}} {count}")
+        return lines
+
+class counter():
+    #A count per combination of label values.
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *values):
+        with self.lock:
+            self.series[values] = self.series.get(values, 0) + 1
+
+    def exposition(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            series = dict(self.series)
+        for values, count in sorted(series.items()):
+            labels = ','.join(f'{label}="{escape(value)}"' for label, value in zip(self.labels, values))
+            lines.append(f"{self.name}{{{labels}}} {count}")
+        return lines
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+stage_seconds = histogram('blaseball_stage_seconds', 'Time spent in each stage of handling a request.', 'stage')
+upstream_seconds = histogram('blaseball_upstream_seconds', 'Latency of upstream API calls, retries included.', 'host')
+upstream_errors = counter('blaseball_upstream_errors_total', 'Upstream API calls that failed, by host and error.', ('host', 'error'))
+request_seconds = histogram('blaseball_request_seconds', 'Time taken to handle each route.', 'endpoint')
+METRICS = [request_seconds, stage_seconds, upstream_seconds, upstream_errors]
+
+#The spans that have finished during the current request, as {stage: [total seconds, count]}, or None outside of one.
+#Background threads don't inherit it, so spans on the prefetcher only show up in the stage histogram.
+request_spans = contextvars.ContextVar('request_spans', default=None)
+
+disabled = contextlib.nullcontext()
+
+class timed_span():
+    __slots__ = ('stage', 'start')
+    def __init__(self, stage):
+        self.stage = stage
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    def __exit__(self, *exc):
+        record(self.stage, time.perf_counter() - self.start)
+
+def record(stage, seconds):
+    stage_seconds.observe(stage, seconds)
+    spans = request_spans.get()
+    if spans is not None:
+        found = spans.setdefault(stage, [0.0, 0])
+        found[0] += seconds
+        found[1] += 1
+
+def span(stage):
+    #Times the block under the given stage name.
+    if not ENABLED:
+        return disabled
+    return timed_span(stage)
+
+class timed_upstream():
+    __slots__ = ('host', 'start')
+    def __init__(self, url):
+        self.host = urllib.parse.urlsplit(url).netloc
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    def __exit__(self, kind, error, traceback):
+        seconds = time.perf_counter() - self.start
+        upstream_seconds.observe(self.host, seconds)
+        record('upstream', seconds)
+        if kind is not None:
+            upstream_errors.inc(self.host, kind.__name__)
+
+def upstream(url):
+    #Times a call to the given upstream URL, and counts it as an error for the host if it raises.
+    if not ENABLED:
+        return disabled
+    return timed_upstream(url)
+
+def begin_request():
+    #Starts collecting spans for Server-Timing. Returns a token for end_request.
+    if not ENABLED:
+        return None
+    spans = {} if SERVER_TIMING else None
+    return time.perf_counter(), spans, request_spans.set(spans)
+
+def end_request(token, endpoint):
+    #Records how long the request took, and returns its Server-Timing header value (or None if that's turned off).
+    if token is None:
+        return None
+    start, spans, reset = token
+    total = time.perf_counter() - start
+    request_seconds.observe(endpoint or 'unknown', total)
+    try:
+        request_spans.reset(reset)
+    except ValueError:
+        #Only happens if the request finished in a different context than it started in, which leaves nothing to clean up anyway.
+        pass
+    if spans is None:
+        return None
+    timings = [f'{stage};dur={seconds*1000:.1f};desc="{count}x"' for stage, (seconds, count) in spans.items()]
+    timings.append(f"total;dur={total*1000:.1f}")
+    return ', '.join(timings)
+
+def exposition():
+    #Every metric in Prometheus' text format.
+    return '\n'.join(line for metric in METRICS for line in metric.exposition()) + '\n'
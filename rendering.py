@@ -0,0 +1,109 @@
+import threading, functools
+from io import BytesIO
+from lazy_module import lazy_module
+np = lazy_module('numpy')
+from vibes import vibes_curve, DAYS
+import metrics
+
+#Chart drawing for the app, using Figure and the Agg canvas directly instead of pyplot.
+#pyplot keeps one global "current figure", so two requests drawing at once on a threaded server can end up in each other's charts.
+#Here every chart has its own Figure, and nothing is shared between threads.
+#matplotlib takes longer to import than the rest of the app put together, so it's only loaded when the first chart is drawn (or by warm_up()).
+
+#Output formats, and the mimetype each one is served with.
+FORMATS = {'jpg': 'image/jpeg', 'png': 'image/png', 'svg': 'image/svg+xml'}
+
+#Same size as pyplot's default figure, so the charts look like they always have.
+FIGSIZE = (6.4, 4.8)
+DPI = 100
+
+@functools.cache
+def matplotlib_classes():
+    #Imports matplotlib with the non-interactive Agg backend chosen explicitly, so it never goes looking for a display.
+    #Returns (Figure, FigureCanvasAgg).
+    import matplotlib
+    matplotlib.use('Agg')
+    #SVG element ids are hashed with a random salt, so without a fixed one every process draws different bytes for the same chart.
+    matplotlib.rcParams['svg.hashsalt'] = 'blaseball'
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    return Figure, FigureCanvasAgg
+
+def new_figure(figsize = FIGSIZE):
+    Figure, FigureCanvasAgg = matplotlib_classes()
+    figure = Figure(figsize=figsize, dpi=DPI)
+    FigureCanvasAgg(figure)
+    return figure
+
+def figure_bytes(figure, format):
+    chart_bytes = BytesIO()
+    #Matplotlib does all of its actual drawing here, so this is where the time goes.
+    with metrics.span('render'):
+        #Charts get a strong ETag from their bytes, so the SVG's Date is left out to keep the same chart byte-identical everywhere.
+        figure.savefig(chart_bytes, format=format, metadata={'Date': None} if format == 'svg' else None)
+    return chart_bytes.getvalue()
+
+#The vibes chart always has the same layout (0 to 100 days, -2 to 2 vibes), so each thread builds its axes once
+#and only swaps the line's data for each new player.
+vibes_templates = threading.local()
+
+def vibes_template():
+    template = getattr(vibes_templates, 'template', None)
+    if template is None:
+        figure = new_figure()
+        axes = figure.add_subplot()
+        line, = axes.plot([], [])
+        axes.set_xlabel('Day')
+        axes.set_ylabel('Vibes')
+        axes.set_xlim(0, 100)
+        axes.set_ylim(-2.0, 2.0)
+        template = vibes_templates.template = (figure, line)
+    return template
+
+def render_vibes_chart(player, format = 'jpg'):
+    #Draws the player's vibes over the course of a hypothetical season and returns the chart as bytes in the given format.
+    figure, line = vibes_template()
+    line.set_data(np.arange(DAYS), vibes_curve(player))
+    return figure_bytes(figure, format)
+
+def render_fate_scatter(fates, stats, cleanstat, season, format = 'jpg'):
+    #Draws the Fate vs. stat scatter plot for a season and returns it as bytes in the given format.
+    figure = new_figure()
+    axes = figure.add_subplot()
+    axes.scatter(x=fates, y=stats)
+    axes.set_xlabel('Fate')
+    axes.set_ylabel(cleanstat)
+    axes.set_title(f'{cleanstat} as compared to Fate in season {season+1}')
+    return figure_bytes(figure, format)
+
+def render_roster_vibes(names, matrix, title, format = 'png'):
+    #Draws a heatmap of a whole roster's vibes (one row per player, one column per day) and returns it as bytes in the given format.
+    figure = new_figure((FIGSIZE[0] * 1.5, max(FIGSIZE[1], 0.25 * len(names) + 1.5)))
+    axes = figure.add_subplot()
+    image = axes.imshow(matrix, aspect='auto', cmap='RdYlGn', vmin=-2.0, vmax=2.0, interpolation='nearest')
+    axes.set_yticks(range(len(names)))
+    axes.set_yticklabels(names, fontsize=8)
+    axes.set_xlabel('Day')
+    axes.set_title(title)
+    figure.colorbar(image, ax=axes, label='Vibes')
+    figure.tight_layout()
+    return figure_bytes(figure, format)
+
+def render_fate_trend(seasons, r, cleanstat, format = 'png'):
+    #Draws how strongly a stat has correlated with Fate in each season and returns the chart as bytes in the given format.
+    #seasons are numbered the way the site shows them; seasons with nothing to correlate (r is None) are left as gaps.
+    figure = new_figure()
+    axes = figure.add_subplot()
+    axes.plot(seasons, [np.nan if value is None else value for value in r], marker='o')
+    axes.axhline(0.0, color='grey', linewidth=0.8)
+    axes.set_xlabel('Season')
+    axes.set_ylabel('Correlation with Fate (r)')
+    axes.set_ylim(-1.0, 1.0)
+    axes.set_title(f'{cleanstat} vs. Fate, season by season')
+    return figure_bytes(figure, format)
+
+def warm_up():
+    #Loads numpy and matplotlib and draws a throwaway chart in every format, so the imports, font loading and Agg setup
+    #are all done before the first real chart is asked for.
+    for format in FORMATS:
+        render_fate_trend([1, 2], [0.5, None], 'Warm-up', format)
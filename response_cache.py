@@ -0,0 +1,108 @@
+import time, threading
+from sqlite_store import sqlite_store
+
+class response_cache(sqlite_store):
+    #Disk-backed cache of raw upstream responses, keyed on the full request URL.
+    #It's stored in SQLite so it survives restarts and can be shared by several worker processes at once.
+    #Entries expire after ttl seconds, and the least recently used ones are evicted once the stored bodies go over max_bytes.
+    #SQLite only lets one connection write at a time, so lookups are kept read-only wherever possible:
+    #hit/miss counts are kept in memory and written out along with the next stored response,
+    #and an entry's last-access time is only rewritten once it's more than touch_interval seconds old.
+    SCHEMA = ["""CREATE TABLE IF NOT EXISTS responses (
+            url TEXT PRIMARY KEY,
+            body BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            stored REAL NOT NULL,
+            accessed REAL NOT NULL)""",
+        "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)",
+        "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+        "INSERT OR IGNORE INTO counters VALUES ('hits', 0), ('misses', 0), ('evictions', 0)",
+        "INSERT OR IGNORE INTO counters SELECT 'bytes', COALESCE(SUM(size), 0) FROM responses"]
+
+    def __init__(self, path, ttl = 86400, max_bytes = 256 * 1024 * 1024, touch_interval = 60):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.touch_interval = touch_interval
+        self.pending = {'hits': 0, 'misses': 0}
+        self.pending_lock = threading.Lock()
+        super().__init__(path)
+
+    def count(self, db, name, amount = 1):
+        db.execute("UPDATE counters SET value = value + ? WHERE name = ?", (amount, name))
+
+    def tally(self, name):
+        with self.pending_lock:
+            self.pending[name] += 1
+
+    def flush(self, db):
+        #Writes the hit/miss counts gathered since the last flush. Must be called inside a write transaction.
+        with self.pending_lock:
+            pending, self.pending = self.pending, {'hits': 0, 'misses': 0}
+        for name, amount in pending.items():
+            if amount:
+                self.count(db, name, amount)
+
+    def get(self, url):
+        #Returns the cached body for the URL, or None if it isn't cached or has expired.
+        db = self.connect()
+        now = time.time()
+        row = db.execute("SELECT body, stored, accessed FROM responses WHERE url = ?", (url,)).fetchone()
+        if row is None or now - row[1] > self.ttl:
+            #Expired entries are left for set() to replace once the response has been fetched again.
+            self.tally('misses')
+            return None
+        if now - row[2] > self.touch_interval:
+            with db:
+                db.execute("UPDATE responses SET accessed = ? WHERE url = ?", (now, url))
+        self.tally('hits')
+        return bytes(row[0])
+
+    def set(self, url, body):
+        #Stores a response body, then evicts the least recently used entries until the cache fits in max_bytes again.
+        if isinstance(body, str):
+            body = body.encode('utf8')
+        if len(body) > self.max_bytes:
+            return
+        db = self.connect()
+        now = time.time()
+        with db:
+            #sqlite3 only starts a transaction at the first write, which would leave the size lookup outside it,
+            #and two processes storing the same URL could both count the whole body towards the byte total.
+            db.execute("BEGIN IMMEDIATE")
+            old = db.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)", (url, body, len(body), now, now))
+            self.count(db, 'bytes', len(body) - (old[0] if old else 0))
+            total = db.execute("SELECT value FROM counters WHERE name = 'bytes'").fetchone()[0]
+            if total > self.max_bytes:
+                evicted = 0
+                freed = 0
+                for old_url, size in db.execute("SELECT url, size FROM responses ORDER BY accessed ASC").fetchall():
+                    if total - freed <= self.max_bytes:
+                        break
+                    db.execute("DELETE FROM responses WHERE url = ?", (old_url,))
+                    freed += size
+                    evicted += 1
+                self.count(db, 'evictions', evicted)
+                self.count(db, 'bytes', -freed)
+            self.flush(db)
+
+    def clear(self):
+        #Drops every cached response. The counters are kept.
+        db = self.connect()
+        with db:
+            db.execute("DELETE FROM responses")
+            db.execute("UPDATE counters SET value = 0 WHERE name = 'bytes'")
+            self.flush(db)
+
+    def stats(self):
+        #Returns the hit/miss/eviction counters (shared by every process using the same file) along with the current size of the cache.
+        db = self.connect()
+        with db:
+            self.flush(db)
+        stats = dict(db.execute("SELECT name, value FROM counters").fetchall())
+        entries, size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        stats['entries'] = entries
+        stats['bytes'] = size
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
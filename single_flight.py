@@ -0,0 +1,60 @@
+import threading
+
+class flight():
+    #One call in progress, and what it came back with once it's done.
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def outcome(self):
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+class single_flight():
+    #Deduplicates concurrent calls for the same key: the first caller runs the call, and everyone who asks for the same key
+    #before it finishes waits for it and gets the same result (or the same exception) instead of starting their own.
+    #Nothing is kept once a call finishes, so this isn't a cache, just a way to make sure a burst of identical requests
+    #only goes upstream once. Results are shared between callers, so they should be treated as read-only.
+    def __init__(self):
+        self.flights = {}
+        self.lock = threading.Lock()
+        self.led = 0
+        self.shared = 0
+
+    def join(self, key):
+        #Returns the flight for the key, and whether the caller is the one who has to run it.
+        with self.lock:
+            found = self.flights.get(key)
+            if found is not None:
+                self.shared += 1
+                return found, False
+            found = self.flights[key] = flight()
+            self.led += 1
+            return found, True
+
+    def land(self, key, found, result = None, error = None):
+        found.result = result
+        found.error = error
+        with self.lock:
+            del self.flights[key]
+            found.done.set()
+
+    def do(self, key, function):
+        #Returns function(), or the result of the call already in flight for the key.
+        found, leader = self.join(key)
+        if not leader:
+            found.done.wait()
+            return found.outcome()
+        try:
+            result = function()
+        except BaseException as e:
+            self.land(key, found, error = e)
+            raise
+        self.land(key, found, result)
+        return result
+
+    def stats(self):
+        with self.lock:
+            return {'led': self.led, 'shared': self.shared, 'in_flight': len(self.flights)}
@@ -0,0 +1,28 @@
+import sqlite3, threading, os
+
+class sqlite_store():
+    #Base for the app's on-disk stores. Handles the per-thread SQLite connections and creating the schema.
+    #Subclasses list their CREATE statements in SCHEMA.
+    SCHEMA = []
+
+    def __init__(self, path):
+        self.path = path
+        #sqlite3 connections can't be shared between threads, so each thread gets its own.
+        self.local = threading.local()
+        db = self.connect()
+        with db:
+            for statement in self.SCHEMA:
+                db.execute(statement)
+
+    def connect(self):
+        #Gets this thread's connection, opening it first if needed.
+        #A connection can't be used across a fork either, so a pre-forked worker opens its own rather than using the one it inherited.
+        db = getattr(self.local, 'db', None)
+        if db is None or self.local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout = 30)
+            #WAL lets readers in other processes keep going while one of them is writing.
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self.local.db = db
+            self.local.pid = os.getpid()
+        return db
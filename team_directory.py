@@ -0,0 +1,71 @@
+import threading, time, os, logging
+
+class team_directory():
+    #Keeps every season's team list in memory once it's been built, along with an id -> team index for quick lookups.
+    #build(season, fresh) should return (all team records, the filtered list to show on the team selection pages),
+    #with fresh set when it's a refresh and has to skip the response cache.
+    #Seasons that have been built are rebuilt in the background every refresh_interval seconds;
+    #if a rebuild fails, the old lists stay in place until the next try.
+    def __init__(self, build, refresh_interval = 3600):
+        self.build = build
+        self.refresh_interval = refresh_interval
+        self.seasons = {}
+        self.lock = threading.Lock()
+        self.refresher = None
+        self.refresher_pid = None
+        self.log = logging.getLogger(__name__)
+
+    def entry(self, season):
+        found = self.seasons.get(season)
+        if found is None:
+            with self.lock:
+                found = self.seasons.get(season)
+                if found is None:
+                    found = self.load(season)
+        self.ensure_refresher()
+        return found
+
+    def load(self, season, fresh = False):
+        teams, selection = self.build(season, fresh)
+        found = {'teams': teams, 'selection': selection, 'by_id': {team.id: team for team in teams + selection}}
+        self.seasons[season] = found
+        return found
+
+    def teams(self, season = 23):
+        #Every team record for the season.
+        return self.entry(season)['teams']
+
+    def selection(self, season = 23):
+        #The filtered list of teams and areas to show on the team selection pages.
+        return self.entry(season)['selection']
+
+    def lookup(self, team_id, season = 23):
+        #The team record with the given ID, or None if there isn't one.
+        return self.entry(season)['by_id'].get(team_id)
+
+    def name(self, team_id, season = 23):
+        #The name of the team with the given ID, or None if there isn't one.
+        team = self.lookup(team_id, season)
+        return team.name if team else None
+
+    def ensure_refresher(self):
+        #Threads don't survive a fork, so a pre-forked worker starts its own refresher the first time it's used.
+        if self.refresh_interval and self.refresher_pid != os.getpid():
+            with self.lock:
+                if self.refresher_pid != os.getpid():
+                    self.refresher_pid = os.getpid()
+                    self.refresher = threading.Thread(target=self.refresh_forever, name='team-directory', daemon=True)
+                    self.refresher.start()
+
+    def refresh_forever(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            self.refresh()
+
+    def refresh(self):
+        #Rebuilds every season that's been loaded so far.
+        for season in list(self.seasons):
+            try:
+                self.load(season, fresh = True)
+            except Exception as e:
+                self.log.warning(f"Couldn't refresh the teams for season {season}: {e}")
@@ -0,0 +1,46 @@
+from lazy_module import lazy_module
+np = lazy_module('numpy')
+
+#Vibes aren't stored on any accessible APIs, but its formula is visible on the front-end of the Blaseball website.
+#We can use this to recreate a player's vibes using stats that actually are stored.
+
+#Length of the regular season, in days.
+DAYS = 99
+
+def vibes_matrix(buoyancy, pressurization, cinnamon, days = DAYS):
+    #Takes arrays of buoyancy, pressurization and cinnamon (one value per player)
+    #and returns an (players x days) array of every player's vibes on every day, in one broadcast.
+    buoyancy = np.asarray(buoyancy, dtype=np.float64)[:, None]
+    pressurization = np.asarray(pressurization, dtype=np.float64)[:, None]
+    cinnamon = np.asarray(cinnamon, dtype=np.float64)[:, None]
+    frequency = 6 + np.round(10 * buoyancy)
+    range = 0.5 * (pressurization + cinnamon)
+    x = np.arange(days)
+    return (range * np.sin(np.pi * ((2 / frequency) * x + 0.5))) - (0.5 * pressurization) + (0.5 * cinnamon)
+
+def vibes_curve(player, days = DAYS):
+    #One player's vibes for every day of the season, for anything with buoyancy, pressurization and cinnamon (like a player_record).
+    return vibes_matrix([player.buoyancy], [player.pressurization], [player.cinnamon], days)[0]
+
+def roster_vibes(players, days = DAYS):
+    #The vibes matrix for a list of player_records, in the same order.
+    return vibes_matrix([player.buoyancy for player in players], [player.pressurization for player in players],
+        [player.cinnamon for player in players], days)
+
+def day_extremes(matrix, day):
+    #Row indexes of the players with the best and worst vibes on the given day.
+    column = matrix[:, day]
+    return int(np.argmax(column)), int(np.argmin(column))
+
+def group_extremes(groups, values):
+    #For parallel arrays of group codes (like team indexes) and values, returns the group codes in order
+    #along with the index of the highest and the lowest value in each group.
+    groups = np.asarray(groups)
+    values = np.asarray(values)
+    order = np.lexsort((values, groups))
+    sorted_groups = groups[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = sorted_groups[1:] != sorted_groups[:-1]
+    last = np.ones(len(order), dtype=bool)
+    last[:-1] = first[1:]
+    return sorted_groups[first], order[last], order[first]